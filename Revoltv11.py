@@ -1,8 +1,280 @@
+import numpy as np
 import pandas as pd
 import re
 import os
-from typing import List, Dict, Optional
-from datetime import datetime
+import io
+import importlib.util
+import multiprocessing
+import shutil
+import stat
+import tempfile
+import hashlib
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, List, Dict, Optional, Tuple, Union
+from datetime import date, datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import xlsxwriter
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# ====================================================
+# Cleaning Rules (compiled once at import time)
+# ====================================================
+BIKE_MODELS_TO_REMOVE = ["RV1","RV400","RV400BRZ","RV1+","RV BLAZEX","RV-400","RV 400","RV BLAZE","RV BLAZE X"]
+NAME_BLACKLIST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "name_blacklist.txt")
+
+BIKE_MODEL_RE = re.compile("(" + "|".join(re.escape(word) for word in BIKE_MODELS_TO_REMOVE) + ")", re.IGNORECASE)
+DASH_RE = re.compile(r"[-\u2013\u2014]")
+SYMBOL_RE = re.compile(r"[_\.0-9!@#$%^&*()+=?/,<>;:\"\\|{}\[\]~`]")
+WHITESPACE_RE = re.compile(r'\s+')
+DIGITS_ONLY_RE = re.compile(r'^\d+$')
+NON_NAME_CHAR_RE = re.compile(r"[^a-zA-Z\s']")
+CAMEL_CASE_RE = re.compile(r'([a-z0-9])([A-Z])')
+WORD_RE = re.compile(r'\S+')
+VOWEL_RE = re.compile(r'[aeiou]')
+MOBILE_PREFIX_RE = re.compile(r'^(\+|00)?\d{1,3}[-\s]?')
+NON_DIGIT_RE = re.compile(r'\D')
+MOBILE_REASONS = ["mobile_is_na", "too_short_digits", "mobile_cleaned"]
+POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+MAX_FLOAT_PLAIN_STR = 1e16  # str(float) switches to scientific notation from here
+
+# ====================================================
+# Junk-name Matcher
+# ====================================================
+class NameMatcher:
+    """
+    Junk-name terms compiled once: exact terms into a dict, contains:/word:
+    terms into a single Aho-Corasick automaton, so checking a name costs the
+    same however many terms there are. Terms and names compare lower-cased.
+    """
+
+    def __init__(self, exact=(), contains=(), words=()):
+        self.exact = {}
+        for term in exact:
+            self.exact.setdefault(term.lower().strip(), term.lower().strip())
+        # Trie over contains:/word: terms; outputs hold (term, whole_word)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List] = [[]]
+        for terms, whole_word in ((contains, False), (words, True)):
+            for term in terms:
+                term = term.lower().strip()
+                if not term:
+                    continue
+                state = 0
+                for ch in term:
+                    if ch not in self._goto[state]:
+                        self._goto.append({})
+                        self._out.append([])
+                        self._goto[state][ch] = len(self._goto) - 1
+                    state = self._goto[state][ch]
+                if (term, whole_word) not in self._out[state]:
+                    self._out[state].append((term, whole_word))
+        self.terms = (tuple(self.exact), tuple(sorted(o for out in self._out for o in out)))
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @classmethod
+    def from_file(cls, path: str) -> "NameMatcher":
+        exact, contains, words = [], [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("contains:"):
+                    contains.append(line[len("contains:"):])
+                elif line.startswith("word:"):
+                    words.append(line[len("word:"):])
+                else:
+                    exact.append(line)
+        return cls(exact, contains, words)
+
+    def _search(self, text: str) -> Optional[str]:
+        """First contains:/word: term found scanning left to right (longest on ties)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for term, whole_word in out[state]:
+                start = end - len(term)
+                if not whole_word or ((start == 0 or not text[start - 1].isalnum())
+                                      and (end == len(text) or not text[end].isalnum())):
+                    return term
+        return None
+
+    def match(self, name: str) -> Optional[str]:
+        """The blacklist term `name` matches, or None."""
+        text = name.lower().strip()
+        term = self.exact.get(text)
+        if term is None and len(self._goto) > 1:
+            term = self._search(text)
+        return term
+
+    def match_column(self, names: pd.Series) -> pd.Series:
+        """match() over a column of lower-cased, stripped names (None/NaN where nothing matches)."""
+        found = names.map(self.exact).to_numpy(dtype=object)
+        if len(self._goto) > 1:
+            rest = pd.isna(found)
+            found[rest] = [self._search(text) for text in names.to_numpy(dtype=object)[rest]]
+        return pd.Series(found, index=names.index, dtype=object)
+
+
+NAME_MATCHER = NameMatcher.from_file(NAME_BLACKLIST_FILE)
+
+
+def use_name_blacklist(matcher) -> NameMatcher:
+    """Switch the junk-name terms (a NameMatcher or a path to a term file); returns the matcher in use."""
+    global NAME_MATCHER
+    NAME_MATCHER = matcher if isinstance(matcher, NameMatcher) else NameMatcher.from_file(matcher)
+    return NAME_MATCHER
+
+# ====================================================
+# Flagged Log (columnar buffer)
+# ====================================================
+LOG_COLUMNS = ["index", "original", "cleaned", "reason"]
+LOG_HEADER = "index,original,cleaned,reason\n"
+LOG_REASONS = [
+    "name_cleaned", "empty_or_invalid_input", "purely_numeric_after_removal",
+    "no_valid_characters_after_cleaning", "blacklist_match", "too_short", "numeric", "no_vowels",
+    "mobile_cleaned", "mobile_is_na", "too_short_digits", "blocklist_match", "duplicate_lead",
+]
+# Reasons written as "<reason>:<detail>" (matched word / leftover digits / kept sheet:row)
+DETAIL_REASONS = ("blacklist_match", "too_short_digits", "duplicate_lead")
+INVALID_REASONS = (
+    "empty_or_invalid_input", "numeric", "no_vowels", "too_short",
+    "purely_numeric_after_removal", "no_valid_characters_after_cleaning",
+    "mobile_is_na", "too_short_digits", "blocklist_match"
+)
+_REASON_CODES = {reason: code for code, reason in enumerate(LOG_REASONS)}
+# invalid_cases has always compared full reason strings, so "<reason>:<detail>" never counted
+_INVALID_CODES = [_REASON_CODES[r] for r in INVALID_REASONS if r not in DETAIL_REASONS]
+
+
+class FlaggedLog:
+    """
+    Array-backed log of flagged rows.
+
+    Entries are stored in column blocks (int64 row index, the raw original
+    values, cleaned values, int8 reason codes, optional detail strings) and the
+    summary counters are updated as blocks are added. Columnar cleaners call
+    extend(); the row-by-row helpers can keep calling append() with a dict.
+    """
+
+    def __init__(self):
+        self._blocks: List[tuple] = []
+        self._rows: List[Dict] = []
+        self.reason_counts = np.zeros(len(LOG_REASONS), dtype=np.int64)
+
+    def extend(self, index, original, reason, cleaned="", detail=None) -> None:
+        """Add a block of entries. `reason` is one reason name or an array of names."""
+        self._flush_rows()
+        index = np.asarray(index, dtype=np.int64)
+        if not len(index):
+            return
+        if isinstance(reason, str):
+            codes = np.full(len(index), _REASON_CODES[reason], dtype=np.int8)
+        else:
+            codes = pd.Categorical(np.asarray(reason, dtype=object), categories=LOG_REASONS).codes.astype(np.int8)
+            if (codes < 0).any():
+                raise ValueError("Unknown flagged-log reason")
+        if isinstance(cleaned, str):
+            cleaned = np.full(len(index), cleaned, dtype=object)
+        self._blocks.append((index, np.asarray(original, dtype=object), np.asarray(cleaned, dtype=object), codes,
+                             None if detail is None else np.asarray(detail, dtype=object)))
+        self.reason_counts += np.bincount(codes, minlength=len(LOG_REASONS))
+
+    def append(self, entry: Dict) -> None:
+        """Add one dict entry in the original {"index", "original", "cleaned"/"cleaned_mobile", "reason"} shape."""
+        reason, _, detail = str(entry.get("reason", "")).partition(":")
+        if reason not in _REASON_CODES or (detail and reason not in DETAIL_REASONS):
+            raise ValueError(f"Unknown flagged-log reason: {entry.get('reason')}")
+        self._rows.append(entry)
+        self.reason_counts[_REASON_CODES[reason]] += 1
+
+    def _flush_rows(self) -> None:
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        parts = [str(r.get("reason", "")).partition(":") for r in rows]
+        codes = np.array([_REASON_CODES[p[0]] for p in parts], dtype=np.int8)
+        self._blocks.append((
+            np.array([r.get("index") for r in rows], dtype=np.int64),
+            np.array([r.get("original", "") for r in rows] + [None], dtype=object)[:-1],
+            np.array([r.get("cleaned", r.get("cleaned_mobile", "")) for r in rows], dtype=object),
+            codes,
+            np.array([p[2] for p in parts], dtype=object),
+        ))
+
+    def __len__(self) -> int:
+        return int(self.reason_counts.sum())
+
+    def count(self, reason: str) -> int:
+        return int(self.reason_counts[_REASON_CODES[reason]])
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "name_fixes": self.count("name_cleaned"),
+            "mobile_fixes": self.count("mobile_cleaned"),
+            "invalid_cases": int(self.reason_counts[_INVALID_CODES].sum()),
+        }
+
+    def take(self) -> "FlaggedLog":
+        """Move this log's entries into a new log, leaving this one empty."""
+        self._flush_rows()
+        taken = FlaggedLog()
+        taken._blocks, self._blocks = self._blocks, []
+        taken.reason_counts, self.reason_counts = self.reason_counts, np.zeros(len(LOG_REASONS), dtype=np.int64)
+        return taken
+
+    def merge(self, other: "FlaggedLog") -> None:
+        """Append another log's entries after this one's."""
+        self._flush_rows()
+        other._flush_rows()
+        self._blocks.extend(other._blocks)
+        self.reason_counts += other.reason_counts
+
+    def to_frame(self) -> pd.DataFrame:
+        self._flush_rows()
+        if not self._blocks:
+            return pd.DataFrame(columns=LOG_COLUMNS)
+        index, original, cleaned, codes, detail = (
+            np.concatenate([b[i] if b[i] is not None else np.full(len(b[0]), "", dtype=object) for b in self._blocks])
+            for i in range(5)
+        )
+        reason = np.asarray(LOG_REASONS, dtype=object)[codes]
+        with_detail = np.isin(codes, [_REASON_CODES[r] for r in DETAIL_REASONS])
+        reason[with_detail] = reason[with_detail] + ":" + detail[with_detail].astype(str)
+        return pd.DataFrame({
+            "index": index,
+            "original": [str(v) for v in original],
+            "cleaned": cleaned,
+            "reason": reason,
+        })
+
+    def write(self, f, header: bool = True) -> None:
+        """Write the log to an open text file in one call, as CSV (fields quoted where needed)."""
+        self.to_frame().to_csv(f, index=False, header=header, lineterminator="\n")
+
 
 # ====================================================
 # Helper Functions (kept from original, preserved behavior)
@@ -11,7 +283,7 @@ def split_camel_case(name: str) -> str:
     if not name or not isinstance(name, str):
         return ""
     if any(c.islower() for c in name):
-        parts = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', name)
+        parts = CAMEL_CASE_RE.sub(r'\1 \2', name)
         return " ".join(parts.split())
     return name
 
@@ -49,26 +321,17 @@ def is_sensible_name(name: str, original_name: str, row_index: Optional[int], lo
         logs.append({"index": row_index, "original": original_name, "cleaned": name, "reason": "empty_or_invalid_input"})
         return False
     lower_name = name.lower().strip()
-    blacklist = [
-        "joker","k","ccc","aaa","busy","king","spam","failureboys",
-        "radhe radhe","jai mata di","jaisairam","shubh din",
-        "emergency enquiry","spam callers","black world",
-        "indian soldiers lover","miss youu guruji","sss","adc",
-        "dsp","ettlement","ww wmeresathi","bsnl fiber","null",
-        "lets learn","typing","always be positive","it doesnt matter",
-        "next","rss","vvv","ggg","kk","ok","lead","test","dummy","na","abc","hotel"
-    ]
-    for word in blacklist:
-        if lower_name == word:
-            logs.append({"index": row_index, "original": original_name, "cleaned": name, "reason": f"blacklist_match:{word}"})
-            return False
+    word = NAME_MATCHER.match(lower_name)
+    if word is not None:
+        logs.append({"index": row_index, "original": original_name, "cleaned": name, "reason": f"blacklist_match:{word}"})
+        return False
     if len(lower_name) < 2:
         logs.append({"index": row_index, "original": original_name, "cleaned": name, "reason": "too_short"})
         return False
-    if re.match(r'^\d+$', lower_name):
+    if DIGITS_ONLY_RE.match(lower_name):
         logs.append({"index": row_index, "original": original_name, "cleaned": name, "reason": "numeric"})
         return False
-    if not re.search(r'[aeiou]', lower_name):
+    if not VOWEL_RE.search(lower_name):
         logs.append({"index": row_index, "original": original_name, "cleaned": name, "reason": "no_vowels"})
         return False
     return True
@@ -87,20 +350,18 @@ def clean_customer_name(name: str, row_index: Optional[int], logs: List[Dict]) -
     name = name.strip()
 
     # Remove bike models
-    bike_models_to_remove = ["RV1","RV400","RV400BRZ","RV1+","RV BLAZEX","RV-400","RV 400","RV BLAZE","RV BLAZE X"]
-    pattern = re.compile("(" + "|".join(re.escape(word) for word in bike_models_to_remove) + ")", re.IGNORECASE)
-    name = pattern.sub("", name).strip()
+    name = BIKE_MODEL_RE.sub("", name).strip()
 
     # Clean symbols/numbers
-    name = re.sub(r"[-\u2013\u2014]", "", name)
-    name = re.sub(r"[_\.0-9!@#$%^&*()+=?/,<>;:\"\\|{}\[\]~`]", "", name)
-    name = re.sub(r'\s+', ' ', name).strip()
+    name = DASH_RE.sub("", name)
+    name = SYMBOL_RE.sub("", name)
+    name = WHITESPACE_RE.sub(' ', name).strip()
 
-    if re.match(r'^\d+$', name.strip()):
+    if DIGITS_ONLY_RE.match(name.strip()):
         logs.append({"index": row_index, "original": original_name, "cleaned": "", "reason": "purely_numeric_after_removal"})
         return ""
 
-    cleaned = re.sub(r"[^a-zA-Z\s']", "", name).strip()
+    cleaned = NON_NAME_CHAR_RE.sub("", name).strip()
     if not cleaned:
         logs.append({"index": row_index, "original": original_name, "cleaned": "", "reason": "no_valid_characters_after_cleaning"})
         return ""
@@ -117,13 +378,105 @@ def clean_customer_name(name: str, row_index: Optional[int], logs: List[Dict]) -
     return cleaned
 
 
+def normalize_customer_names(names: pd.Series) -> pd.DataFrame:
+    """
+    Batch equivalent of clean_customer_name, without the logging.
+
+    Each distinct raw value is cleaned once with .str operations and the results
+    are mapped back onto the rows. Returns a frame aligned to `names` with the
+    cleaned name ("name"), the log reason (None when nothing is logged), the
+    value the log shows as cleaned ("logged") and the matched blacklist word
+    ("detail").
+    """
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    raw = pd.Series(uniques, dtype=object)
+
+    # Non-string, NaN and blank values are rejected before any cleaning
+    is_text = raw.map(lambda v: isinstance(v, str)).astype(bool)
+    text = raw.where(is_text, "")
+    valid = is_text & (text.str.strip() != "")
+
+    name = text.str.strip()
+    name = name.str.replace(BIKE_MODEL_RE, "", regex=True).str.strip()
+    name = name.str.replace(DASH_RE, "", regex=True)
+    name = name.str.replace(SYMBOL_RE, "", regex=True)
+    name = name.str.replace(WHITESPACE_RE, " ", regex=True).str.strip()
+    numeric_after_removal = valid & name.str.match(DIGITS_ONLY_RE)
+
+    cleaned = name.str.replace(NON_NAME_CHAR_RE, "", regex=True).str.strip()
+    no_valid_chars = valid & ~numeric_after_removal & (cleaned == "")
+
+    # split_camel_case followed by per-word capitalisation
+    has_lower = cleaned.str.contains("[a-z]", regex=True)
+    cleaned = cleaned.where(~has_lower, cleaned.str.replace(CAMEL_CASE_RE, r"\1 \2", regex=True))
+    cleaned = cleaned.str.replace(WORD_RE, lambda m: m.group(0).capitalize(), regex=True)
+    cleaned = cleaned.str.replace(WHITESPACE_RE, " ", regex=True).str.strip()
+
+    # is_sensible_name checks, in the same order
+    candidate = valid & ~numeric_after_removal & ~no_valid_chars
+    lower_name = cleaned.str.lower().str.strip()
+    blacklisted = NAME_MATCHER.match_column(lower_name.where(candidate, ""))
+
+    reason = pd.Series(None, index=raw.index, dtype=object)
+    logged = pd.Series("", index=raw.index, dtype=object)
+    result = pd.Series("", index=raw.index, dtype=object)
+
+    checks = [
+        (~valid, "empty_or_invalid_input", False),
+        (numeric_after_removal, "purely_numeric_after_removal", False),
+        (no_valid_chars, "no_valid_characters_after_cleaning", False),
+        (candidate & (cleaned == ""), "empty_or_invalid_input", True),
+        (candidate & blacklisted.notna(), "blacklist_match", True),
+        (candidate & (lower_name.str.len() < 2), "too_short", True),
+        (candidate & lower_name.str.match(DIGITS_ONLY_RE), "numeric", True),
+        (candidate & ~lower_name.str.contains(VOWEL_RE, regex=True), "no_vowels", True),
+    ]
+    for mask, why, keep_cleaned in checks:
+        hit = mask & reason.isna()
+        reason = reason.mask(hit, why)
+        if keep_cleaned:
+            logged = logged.mask(hit, cleaned)
+
+    accepted = reason.isna()
+    result = result.mask(accepted, cleaned)
+    changed = accepted & (cleaned != text)
+    reason = reason.mask(changed, "name_cleaned")
+    logged = logged.mask(changed, cleaned)
+
+    # Map per-value results back onto the rows
+    return pd.DataFrame({
+        "name": result.to_numpy()[codes],
+        "reason": reason.to_numpy()[codes],
+        "logged": logged.to_numpy()[codes],
+        "detail": blacklisted.fillna("").to_numpy()[codes],
+    }, index=names.index, dtype=object)
+
+
+def log_customer_names(names: pd.Series, result: pd.DataFrame, log: FlaggedLog) -> pd.Series:
+    """Log normalize_customer_names results in row order; returns the cleaned column."""
+    flagged = pd.notna(result["reason"].to_numpy())
+    log.extend(
+        names.index[flagged], names.to_numpy(dtype=object)[flagged], result["reason"].to_numpy()[flagged],
+        cleaned=result["logged"].to_numpy()[flagged], detail=result["detail"].to_numpy()[flagged],
+    )
+    return pd.Series(result["name"].to_numpy(), index=names.index, dtype=object)
+
+
+def clean_customer_names(names: pd.Series, log: FlaggedLog) -> pd.Series:
+    """
+    Column-wise equivalent of clean_customer_name: the same values and log
+    entries (in row order) as calling it row by row.
+    """
+    return log_customer_names(names, normalize_customer_names(names), log)
+
+
 def clean_mobile_number(raw_mobile: str, row_index: Optional[int], logs: List[Dict]) -> str:
     if pd.isna(raw_mobile):
         logs.append({"index": row_index, "original": raw_mobile, "cleaned_mobile": "", "reason": "mobile_is_na"})
         return ""
     s = str(raw_mobile).strip()
-    s = re.sub(r'^(\+|00)?\d{1,3}[-\s]?', '', s)
-    digits = re.sub(r'\D', '', s)
+    s = MOBILE_PREFIX_RE.sub('', s)
+    digits = NON_DIGIT_RE.sub('', s)
     if len(digits) < 10:
         logs.append({"index": row_index, "original": raw_mobile, "cleaned_mobile": "", "reason": f"too_short_digits:{digits}"})
         return ""
@@ -133,211 +486,2211 @@ def clean_mobile_number(raw_mobile: str, row_index: Optional[int], logs: List[Di
     return cleaned
 
 
+def _mobile_digits(text: str) -> str:
+    """Digits clean_mobile_number keeps from str(raw_mobile), before taking the last 10."""
+    return NON_DIGIT_RE.sub('', MOBILE_PREFIX_RE.sub('', text.strip()))
+
+
+def _zero_pad(values: np.ndarray, widths: np.ndarray) -> np.ndarray:
+    """Render non-negative ints as strings left-padded with zeros to per-row widths (0 -> "")."""
+    out = np.full(len(values), "", dtype=object)
+    for width in np.unique(widths):
+        if width == 0:
+            continue
+        rows = widths == width
+        out[rows] = pd.Series(values[rows]).astype(str).str.zfill(int(width)).to_numpy(dtype=object)
+    return out
+
+
+def _numeric_mobile_rows(mobiles: pd.Series, is_na: np.ndarray) -> np.ndarray:
+    """Rows holding whole, non-negative numbers whose str() is plain digits (plus '.0' for floats)."""
+    if pd.api.types.is_bool_dtype(mobiles) or not pd.api.types.is_numeric_dtype(mobiles):
+        return np.zeros(len(mobiles), dtype=bool)
+    values = mobiles.to_numpy(dtype="float64", na_value=-1.0)
+    limit = 1e18 if pd.api.types.is_integer_dtype(mobiles) else MAX_FLOAT_PLAIN_STR
+    return ~is_na & ~np.signbit(values) & (values < limit) & (np.floor(values) == values)
+
+
+def normalize_mobile_numbers(mobiles: pd.Series) -> pd.DataFrame:
+    """
+    Batch equivalent of clean_mobile_number, without the logging.
+
+    Returns a frame aligned to `mobiles` with the cleaned number ("mobile"), a
+    categorical reason code ("reason": mobile_is_na / too_short_digits /
+    mobile_cleaned, NaN when the value was already clean) and the digits left
+    after prefix stripping ("digits", used for the too_short_digits detail).
+
+    Whole numbers coming back from Excel as int or float columns are handled
+    arithmetically (digit counts and remainders) instead of through per-row
+    strings; everything else goes through the same regexes as the row version.
+    """
+    size = len(mobiles)
+    is_na = mobiles.isna().to_numpy()
+    mobile = np.full(size, "", dtype=object)
+    digits = np.full(size, "", dtype=object)
+    too_short = np.zeros(size, dtype=bool)
+    changed = np.zeros(size, dtype=bool)
+
+    numeric = _numeric_mobile_rows(mobiles, is_na)
+    if numeric.any():
+        values = mobiles[numeric].to_numpy(dtype="int64")
+        # MOBILE_PREFIX_RE eats the first 1-3 digits of a plain number
+        n_digits = np.maximum(np.searchsorted(POWERS_OF_TEN, values, side="right"), 1)
+        kept = np.maximum(n_digits - 3, 0)
+        rest = values % POWERS_OF_TEN[kept]
+        if pd.api.types.is_float_dtype(mobiles):
+            # str(float) ends in ".0", which leaves one more trailing zero digit
+            rest = rest * 10
+            kept = kept + 1
+        short = kept < 10
+        digits[numeric] = np.where(short, _zero_pad(rest, np.where(short, kept, 0)), "")
+        mobile[numeric] = _zero_pad(rest % 10 ** 10, np.where(short, 0, 10))
+        too_short[numeric] = short
+        changed[numeric] = ~short
+
+    text_rows = ~is_na & ~numeric
+    if text_rows.any():
+        raw = mobiles[text_rows]
+        if pd.api.types.is_datetime64_any_dtype(raw) or isinstance(raw.dtype, pd.PeriodDtype):
+            text = raw.map(str)
+        else:
+            text = raw.astype(str)
+        # Strings repeat (re-exports, retries), so strip each distinct value once
+        codes, uniques = pd.factorize(text.to_numpy(dtype=object))
+        unique_digits = np.array([_mobile_digits(t) for t in uniques], dtype=object)
+        row_text = uniques.astype(object)[codes]
+        row_digits = unique_digits[codes]
+        lengths = np.fromiter(map(len, unique_digits), dtype=np.int64, count=len(unique_digits))[codes]
+        short = lengths < 10
+        cleaned = np.array([d[-10:] for d in unique_digits], dtype=object)[codes]
+        cleaned[short] = ""
+        digits[text_rows] = np.where(short, row_digits, "")
+        mobile[text_rows] = cleaned
+        too_short[text_rows] = short
+        changed[text_rows] = ~short & (cleaned != row_text)
+
+    reason = np.full(size, None, dtype=object)
+    reason[is_na] = "mobile_is_na"
+    reason[too_short] = "too_short_digits"
+    reason[changed] = "mobile_cleaned"
+
+    return pd.DataFrame({
+        "mobile": mobile,
+        "reason": pd.Categorical(reason, categories=MOBILE_REASONS),
+        "digits": digits,
+    }, index=mobiles.index)
+
+
+def log_mobile_numbers(mobiles: pd.Series, result: pd.DataFrame, log: FlaggedLog) -> pd.Series:
+    """Log normalize_mobile_numbers results in row order; returns the cleaned column."""
+    flagged = result["reason"].notna().to_numpy()
+    logged = result[flagged]
+    log.extend(
+        logged.index, mobiles.to_numpy(dtype=object)[flagged], logged["reason"].astype(object).to_numpy(),
+        cleaned=logged["mobile"].to_numpy(), detail=logged["digits"].to_numpy(),
+    )
+    return result["mobile"]
+
+
+def clean_mobile_numbers(mobiles: pd.Series, log: FlaggedLog) -> pd.Series:
+    """Column-wise clean_mobile_number: same values and log entries, in row order."""
+    return log_mobile_numbers(mobiles, normalize_mobile_numbers(mobiles), log)
+
+
 # ====================================================
-# Blocklist Support (with deduplication)
+# Column-wise Date Detection & Formatting
 # ====================================================
-def load_blocklist(file_path="seen_feedback_mobiles.csv"):
+DATE_OUTPUT_FORMAT = "%#d %B" if os.name == "nt" else "%-d %B"
+DATE_SAMPLE_SIZE = 10
+# Template fields that never hold dates; their values are not sniffed
+NON_DATE_FIELDS = ("hub", "model", "opportunity_id")
+
+
+@lru_cache(maxsize=65536)
+def _parse_date_text(text: str):
+    """The per-value parse format_date_column does, cached per distinct string."""
     try:
-        df = pd.read_csv(file_path, dtype=str, header=None)
+        return pd.to_datetime(text, errors="coerce", dayfirst=True)
     except Exception:
-        return pd.DataFrame(columns=["Mobile", "DateAdded"])
-    
-    if df.shape[1] == 1:
-        df.columns = ["Mobile"]
-        df["DateAdded"] = datetime.today().strftime("%Y-%m-%d")
-        df.to_csv(file_path, index=False)
-    else:
+        return pd.NaT
+
+
+def infer_date_format(sample) -> Optional[str]:
+    """First strftime format guessed (dayfirst) from a sample of string values."""
+    for text in sample:
+        try:
+            fmt = guess_datetime_format(text, dayfirst=True)
+        except Exception:
+            fmt = None
+        if fmt:
+            return fmt
+    return None
+
+
+def _field_orders(fmt: str) -> List[str]:
+    """
+    Day-first then month-first versions of a format ('%Y-%m-%d' -> ['%Y-%d-%m', '%Y-%m-%d']).
+    With dayfirst=True pandas reads every ambiguous date day-first, even ISO-looking
+    ones, and only falls back to month-first when the day-first reading is invalid.
+    """
+    if "%m" not in fmt or "%d" not in fmt:
+        return [fmt]
+    swapped = re.sub("%[md]", lambda m: "%d" if m.group(0) == "%m" else "%m", fmt)
+    return [fmt, swapped] if fmt.index("%d") < fmt.index("%m") else [swapped, fmt]
+
+
+def _strftime_lookup(parsed: pd.DatetimeIndex) -> np.ndarray:
+    """Format timestamps via a (month, day) lookup; output only depends on those two."""
+    out = np.full(len(parsed), None, dtype=object)
+    valid = ~parsed.isna()
+    if not valid.any():
+        return out
+    stamps = parsed[valid]
+    key_codes, _ = pd.factorize(stamps.month * 100 + stamps.day)
+    _, first_seen = np.unique(key_codes, return_index=True)
+    labels = np.array([stamps[pos].strftime(DATE_OUTPUT_FORMAT) for pos in first_seen], dtype=object)
+    out[valid] = labels[key_codes]
+    return out
+
+
+def label_date_strings(texts: np.ndarray) -> np.ndarray:
+    """
+    '7 October' labels for distinct strings, None where they don't parse.
+
+    Matches pd.to_datetime(val, dayfirst=True) per value: the column format is
+    inferred from the first values and applied in one vectorized call (day-first
+    ordering first, see _field_orders); the few values that fit neither go
+    through the cached scalar parse.
+    """
+    labels = np.full(len(texts), None, dtype=object)
+    pending = np.ones(len(texts), dtype=bool)
+    fmt = infer_date_format(texts[:DATE_SAMPLE_SIZE])
+    if fmt:
+        for candidate in _field_orders(fmt):
+            try:
+                parsed = pd.to_datetime(pd.Index(texts[pending], dtype=object), format=candidate, errors="coerce")
+            except Exception:
+                continue
+            rows = pending.nonzero()[0]
+            labels[rows] = _strftime_lookup(parsed)
+            pending[rows[~parsed.isna()]] = False
+    for pos in pending.nonzero()[0]:
+        dt = _parse_date_text(texts[pos])
+        if pd.notna(dt):
+            labels[pos] = dt.strftime(DATE_OUTPUT_FORMAT)
+    return labels
+
+
+def format_dates(values: pd.Series) -> pd.Series:
+    """
+    Column-wise equivalent of format_date_column.
+
+    Distinct strings are parsed once (see label_date_strings), datetime values in
+    bulk, and '7 October' labels come from a lookup. Values that do not parse keep
+    str(value) as before.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = pd.DatetimeIndex(values)
+        out = _strftime_lookup(parsed)
+        out[parsed.isna()] = "NaT"
+        return pd.Series(out, index=values.index, dtype=object)
+
+    raw = values.to_numpy(dtype=object)
+    out = np.empty(len(raw), dtype=object)
+
+    is_text = np.fromiter((isinstance(v, str) for v in raw), dtype=bool, count=len(raw))
+    if is_text.any():
+        codes, uniques = pd.factorize(raw[is_text])
+        text_out = label_date_strings(np.asarray(uniques, dtype=object))[codes]
+        failed = pd.isna(text_out)
+        text_out[failed] = raw[is_text][failed]
+        out[is_text] = text_out
+
+    missing = pd.isna(raw) & ~is_text
+    out[missing] = [str(v) for v in raw[missing]]
+
+    # Timestamps, numbers and anything else: same scalar handling as before,
+    # once per distinct (type, value)
+    seen = {}
+    for pos in (~is_text & ~missing).nonzero()[0]:
+        val = raw[pos]
+        key = (type(val), val)
+        try:
+            label = seen[key]
+        except (KeyError, TypeError):
+            try:
+                dt = pd.to_datetime(val, errors="coerce", dayfirst=True)
+                label = dt.strftime(DATE_OUTPUT_FORMAT) if pd.notna(dt) else str(val)
+            except Exception:
+                label = str(val)
+            try:
+                seen[key] = label
+            except TypeError:
+                pass
+        out[pos] = label
+    return pd.Series(out, index=values.index, dtype=object)
+
+
+def find_date_columns(df: pd.DataFrame) -> List[str]:
+    """
+    Columns named like a date plus columns whose first non-null values parse as
+    dates (same rule as looks_like_date over a 10-value sample). NON_DATE_FIELDS
+    are never sniffed.
+    """
+    date_cols = list(resolve_schema(df.columns).named_date_cols)
+    for col in df.columns:
+        if col in date_cols or col in NON_DATE_FIELDS:
+            continue
+        sample = pd.unique(df[col].dropna().astype(str).head(DATE_SAMPLE_SIZE).to_numpy(dtype=object))
+        if len(sample) and pd.notna(label_date_strings(sample)).any():
+            date_cols.append(col)
+    return date_cols
+
+
+# ====================================================
+# Blocklist Support (indexed, append-only)
+# ====================================================
+BLOCKLIST_FILE = "seen_feedback_mobiles.csv"
+# Next to the blocklist: entries added before the date in it have expired
+RETENTION_SUFFIX = ".retention"
+AS_OF_CACHE_SIZE = 8
+
+
+def _mobile_keys(mobiles) -> tuple:
+    """(mask, int64 keys) for the values that are exactly 10 ASCII digits."""
+    text = np.asarray(mobiles, dtype=object)
+    mask = np.fromiter(
+        (isinstance(m, str) and len(m) == 10 and m.isascii() and m.isdigit() for m in text),
+        dtype=bool, count=len(text)
+    )
+    return mask, text[mask].astype("U10").astype(np.int64)
+
+
+class BlocklistStore:
+    """
+    Mobiles already sent for feedback, loaded once per run.
+
+    Numbers are held as a sorted int64 array with the date each was first added,
+    so membership is a binary search. A second copy sorted by date backs as-of
+    queries: the entries added on/before a cutoff are a bisect and a slice, and
+    the resulting lookup structure is cached per cutoff. The CSV is the
+    persisted copy (it is what gets committed back to GitHub) and is only ever
+    appended to; expire() records a retention watermark beside it (on the next
+    flush()) instead of rewriting it. Rows that are not 10-digit numbers (stray header lines,
+    blanks) can never match a cleaned mobile and are skipped.
+    """
+
+    def __init__(self, file_path: Optional[str] = BLOCKLIST_FILE):
+        self.file_path = file_path
+        self.mobiles = np.empty(0, dtype=np.int64)
+        self.dates = np.empty(0, dtype="datetime64[ns]")
+        self._by_date = None
+        self._as_of: Dict[np.datetime64, "BlocklistStore"] = {}
+        # add(..., persist=False) entries not yet appended to the CSV
+        self._pending: List[pd.DataFrame] = []
+        # expire() watermark not yet saved next to the CSV
+        self._watermark: Optional[np.datetime64] = None
+
+    @staticmethod
+    def read_watermark(file_path: Optional[str]) -> Optional[np.datetime64]:
+        """The retention watermark saved next to `file_path`, if any."""
+        if not file_path or not os.path.exists(file_path + RETENTION_SUFFIX):
+            return None
+        with open(file_path + RETENTION_SUFFIX, encoding="utf-8") as f:
+            text = f.read().strip()
+        return np.datetime64(text, "ns") if text else None
+
+    @classmethod
+    def from_csv(cls, file_path: str = BLOCKLIST_FILE) -> "BlocklistStore":
+        """Import the existing CSV (one-column legacy files are migrated once), minus expired entries."""
+        store = cls(file_path)
+        try:
+            df = pd.read_csv(file_path, dtype=str, header=None)
+        except Exception:
+            return store
+
+        if df.shape[1] == 1:
+            df.columns = ["Mobile"]
+            df["DateAdded"] = datetime.today().strftime("%Y-%m-%d")
+            df.to_csv(file_path, index=False)
+        df = df.iloc[:, :2]
         df.columns = ["Mobile", "DateAdded"]
 
-    # Deduplicate blocklist each time it’s loaded
-    df.drop_duplicates(subset=["Mobile"], keep="first", inplace=True)
-    df.to_csv(file_path, index=False)
-    return df
+        mask, keys = _mobile_keys(df["Mobile"])
+        dates = pd.to_datetime(df["DateAdded"][mask], format="%Y-%m-%d", errors="coerce").to_numpy(dtype="datetime64[ns]")
+        watermark = cls.read_watermark(file_path)
+        if watermark is not None:
+            # Expired rows are skipped before deduplication, so a number seen again later counts from then
+            live = ~(dates < watermark)
+            keys, dates = keys[live], dates[live]
+        # First occurrence wins, as the old drop_duplicates(keep="first") did
+        store.mobiles, first = np.unique(keys, return_index=True)
+        store.dates = dates[first]
+        return store
+
+    def _date_index(self):
+        """(dates, mobiles) ordered by date added (undated entries last), built once per change."""
+        if self._by_date is None:
+            order = np.argsort(self.dates, kind="stable")
+            self._by_date = (self.dates[order], self.mobiles[order])
+        return self._by_date
+
+    def _changed(self) -> None:
+        self._by_date = None
+        self._as_of.clear()
+
+    def as_of(self, cutoff_date) -> "BlocklistStore":
+        """In-memory view of the entries added on/before cutoff_date (cached per cutoff)."""
+        cutoff = pd.to_datetime(cutoff_date).to_datetime64().astype("datetime64[ns]")
+        view = self._as_of.get(cutoff)
+        if view is None:
+            dates, mobiles = self._date_index()
+            end = np.searchsorted(dates, cutoff, side="right")
+            order = np.argsort(mobiles[:end])
+            view = BlocklistStore(None)
+            view.mobiles, view.dates = mobiles[:end][order], dates[:end][order]
+            if len(self._as_of) >= AS_OF_CACHE_SIZE:
+                self._as_of.pop(next(iter(self._as_of)))
+            self._as_of[cutoff] = view
+        return view
+
+    def expire(self, max_age_days: int, today: Optional[datetime] = None) -> int:
+        """
+        Drop entries added more than max_age_days before today, in bulk. The
+        watermark is saved next to the CSV by the next flush(), so later loads
+        skip them too (the CSV itself is not rewritten). Returns how many
+        entries expired.
+        """
+        today = pd.Timestamp(today or datetime.today()).normalize()
+        watermark = (today - pd.Timedelta(days=max_age_days)).to_datetime64().astype("datetime64[ns]")
+        dates, mobiles = self._date_index()
+        start = np.searchsorted(dates, watermark, side="left")
+        if start:
+            order = np.argsort(mobiles[start:])
+            self.mobiles, self.dates = mobiles[start:][order], dates[start:][order]
+            self._changed()
+        if self._watermark is None or watermark > self._watermark:
+            self._watermark = watermark
+        return int(start)
+
+    def __len__(self) -> int:
+        return len(self.mobiles)
+
+    def snapshot(self) -> "BlocklistStore":
+        """In-memory view of the current entries; later add() calls don't show up in it."""
+        view = BlocklistStore(None)
+        view.mobiles, view.dates = self.mobiles, self.dates
+        return view
+
+    def checkpoint(self) -> Tuple:
+        """State to hand back to rollback() if the run that follows fails."""
+        return self.mobiles, self.dates, len(self._pending), self._watermark
+
+    def rollback(self, state: Tuple) -> None:
+        """Undo the add()/expire() calls made since checkpoint(), including rows not yet flushed."""
+        self.mobiles, self.dates, pending, self._watermark = state
+        del self._pending[pending:]
+        self._changed()
+
+    def contains(self, mobiles, cutoff_date: Optional[datetime] = None) -> np.ndarray:
+        """Boolean mask: which of `mobiles` are blocked (optionally only entries added on/before cutoff)."""
+        known = self.as_of(cutoff_date).mobiles if cutoff_date else self.mobiles
+        mask, keys = _mobile_keys(mobiles)
+        pos = np.searchsorted(known, keys).clip(max=max(len(known) - 1, 0))
+        hits = np.zeros(len(mask), dtype=bool)
+        if len(known):
+            hits[mask] = known[pos] == keys
+        return hits
+
+    def add(self, mobiles: List[str], date_added: Optional[str] = None, persist: bool = True) -> None:
+        """
+        Append new numbers to the CSV (no rewrite) and to the in-memory index.
+        With persist=False only the index is updated; the CSV rows are held
+        until flush().
+        """
+        if not len(mobiles):
+            return
+        date_added = date_added or datetime.today().strftime("%Y-%m-%d")
+        # Only valid numbers not indexed yet are kept, so the CSV holds what the index holds
+        mask, keys = _mobile_keys(mobiles)
+        keys, first = np.unique(keys, return_index=True)
+        new = ~np.isin(keys, self.mobiles)
+        keys = keys[new]
+        if not len(keys):
+            return
+        if self.file_path:
+            text = np.asarray(mobiles, dtype=object)[mask][first[new]]
+            self._pending.append(pd.DataFrame({"Mobile": text, "DateAdded": date_added}))
+            if persist:
+                self.flush()
+        pos = np.searchsorted(self.mobiles, keys)
+        self.mobiles = np.insert(self.mobiles, pos, keys)
+        self.dates = np.insert(self.dates, pos, np.datetime64(date_added, "ns"))
+        self._changed()
+
+    def flush(self) -> None:
+        """
+        Append the rows held back by add(..., persist=False) to the CSV in one
+        write, and save the expire() watermark if it is later than the saved one.
+        """
+        if not self.file_path:
+            return
+        if self._pending:
+            pending, self._pending = self._pending, []
+            pd.concat(pending, ignore_index=True).to_csv(self.file_path, mode="a", index=False, header=False)
+        if self._watermark is not None:
+            watermark, self._watermark = self._watermark, None
+            saved = self.read_watermark(self.file_path)
+            if saved is None or watermark > saved:
+                with open(self.file_path + RETENTION_SUFFIX, "w", encoding="utf-8") as f:
+                    f.write(str(watermark.astype("datetime64[D]")) + "\n")
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Mobile": self.mobiles.astype(str).astype("U10"),
+            "DateAdded": pd.Series(self.dates).dt.strftime("%Y-%m-%d"),
+        })
+
+
+def load_blocklist(file_path=BLOCKLIST_FILE):
+    """Deduplicated blocklist as a Mobile/DateAdded frame (the file is not rewritten)."""
+    return BlocklistStore.from_csv(file_path).to_frame()
 
 
 # ====================================================
-# Main Processing Function (preserves original behavior + dual exports)
+# Input Reading (optionally only the target sheets/columns)
 # ====================================================
-def process_file(
-    input_file_path: str,
-    flagged_log_path: str = "flagged_names.txt",
-    apply_blocklist: bool = True,
-    cutoff_date: Optional[datetime] = None
-):
+REMINDER_SHEET = "Upcoming_TR_Today_to_Today+3"
+FEEDBACK_SHEET = "TR_Completed_Y-5_to_Y"
+TARGET_SHEETS = (REMINDER_SHEET, FEEDBACK_SHEET)
+
+# Standard Calls template columns (exact spelling)
+TEMPLATE_COLS = ['hub', 'model', 'customer_name', 'mobile_number', 'opportunity_id', 'trscheduleactual']
+MOBILE_COLUMN_KEYS = ('mobilenumber', 'mobile', 'mobile_no', 'mobileno', 'contactnumber')
+NAME_COLUMN_KEYS = ('customername', 'customer', 'buyername', 'name')
+
+
+def find_columns(columns, keys) -> List[str]:
+    """Header names that match one of `keys` once lower-cased with spaces removed."""
+    return [col for col in columns if isinstance(col, str) and col.lower().replace(' ', '') in keys]
+
+
+def preferred_excel_engine() -> Optional[str]:
+    """The calamine (Rust) reader when python-calamine is installed, else pandas' default."""
+    if importlib.util.find_spec("python_calamine") is None:
+        return None
+    if tuple(int(p) for p in pd.__version__.split(".")[:2]) < (2, 2):
+        return None
+    return "calamine"
+
+
+def select_input_columns(header: List) -> List[int]:
     """
-    Processes input file, applies cleaning and blocklist, and generates two formatted outputs:
-      - Revolt TD Reminder {date}.xlsx  (from sheet Upcoming_TR_Today_to_Today+3)
-      - Revolt TD Feedback {date}.xlsx  (from sheet TR_Completed_Y-5_to_Y, using trcompleteddate -> trscheduleactual)
+    Positions of the header columns process_file can use for a target sheet: the
+    template columns, trcompleteddate, opportunityid, and the first mobile/name
+    candidate (the ones process_file cleans).
+    """
+    wanted = set(TEMPLATE_COLS) | {"trcompleteddate"}
+    first_candidates = [cols[0] for cols in (find_columns(header, MOBILE_COLUMN_KEYS), find_columns(header, NAME_COLUMN_KEYS)) if cols]
+    keep = []
+    for pos, col in enumerate(header):
+        if col in wanted or col in first_candidates:
+            keep.append(pos)
+        elif isinstance(col, str) and col.strip().lower() == "opportunityid":
+            keep.append(pos)
+    return keep
+
 
-    Returns a dict with summary counts and paths to generated files (if created).
+class SheetSchema:
+    """
+    What the pipeline needs to know about one header row, worked out once:
+    the opportunityid rename, the mobile and name columns it cleans, which
+    column feeds each template field, the columns named like dates, and the
+    column positions and dtypes a selective read asks for. Get one through
+    resolve_schema(), which caches it per header signature.
     """
-    if not os.path.exists(input_file_path):
-        raise FileNotFoundError(f"Input file not found: {input_file_path}")
 
-    logs: List[Dict] = []
+    def __init__(self, header):
+        self.header = tuple(header)
+        self.renames = {col: "opportunity_id" for col in self.header
+                        if isinstance(col, str) and col.strip().lower() == "opportunityid"}
+        self.columns = [self.renames.get(col, col) for col in self.header]
 
-    # Read input
-    if input_file_path.lower().endswith(('.xlsx', '.xls')):
-        all_sheets = pd.read_excel(input_file_path, sheet_name=None)
-    elif input_file_path.lower().endswith('.csv'):
-        all_sheets = {"Sheet1": pd.read_csv(input_file_path)}
-    else:
+        mobile_candidates = find_columns(self.columns, MOBILE_COLUMN_KEYS)
+        name_candidates = find_columns(self.columns, NAME_COLUMN_KEYS)
+        self.mobile_col = mobile_candidates[0] if mobile_candidates else None
+        self.name_col = name_candidates[0] if name_candidates else None
+
+        # Template field -> column it is taken from (as align_to_template renames them)
+        self.fields = {col: col for col in TEMPLATE_COLS if col in self.columns}
+        for field, source in (("mobile_number", self.mobile_col), ("customer_name", self.name_col)):
+            if source is not None and field not in self.columns:
+                self.fields[field] = source
+        self.named_date_cols = [col for col in self.columns if isinstance(col, str) and "date" in col.lower()]
+
+        # Typed, narrowed reads: only the usable columns, mobiles as text so they never come back as floats
+        self.usecols = select_input_columns(list(self.header))
+        kept = [self.header[pos] for pos in self.usecols]
+        self.dtypes = {col: str for col in set(find_columns(kept, MOBILE_COLUMN_KEYS)) | ({"mobile_number"} & set(kept))}
+
+    @property
+    def source_columns(self) -> List:
+        """Columns that end up in the template output (template_source_columns)."""
+        sources = [col for col in TEMPLATE_COLS if col in self.columns]
+        return sources + [source for field, source in self.fields.items() if source != field]
+
+
+@lru_cache(maxsize=256)
+def _resolve_schema(header: tuple) -> SheetSchema:
+    return SheetSchema(header)
+
+
+def resolve_schema(columns) -> SheetSchema:
+    """The SheetSchema for a header, resolved once per distinct header signature."""
+    return _resolve_schema(tuple(columns))
+
+
+def read_input_sheets(input_file_path: str, selective: bool = False, engine: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Read the input file into {sheet_name: DataFrame}.
+
+    selective=True (workbooks only) resolves sheet names and headers first, then
+    reads just the two target sheets and the columns process_file keeps, with
+    mobile columns as strings so they never come back as floats. `engine`
+    defaults to the fastest installed Excel reader.
+    """
+    lower_path = input_file_path.lower()
+    if lower_path.endswith('.csv'):
+        return {"Sheet1": pd.read_csv(input_file_path)}
+    if not lower_path.endswith(('.xlsx', '.xls')):
         raise ValueError("Unsupported file format")
+    if not selective:
+        return pd.read_excel(input_file_path, sheet_name=None, engine=engine)
 
-    cleaned_sheets = {}
-    new_numbers = 0
-    blocklist_file = "seen_feedback_mobiles.csv"
-    outputs = {"reminder": None, "feedback": None}
+    sheets = {}
+    with pd.ExcelFile(input_file_path, engine=engine or preferred_excel_engine()) as workbook:
+        for sheet_name in workbook.sheet_names:
+            if sheet_name.strip() not in TARGET_SHEETS:
+                continue
+            schema = resolve_schema(workbook.parse(sheet_name, nrows=0).columns)
+            sheets[sheet_name] = workbook.parse(sheet_name, usecols=schema.usecols, dtype=schema.dtypes)
+    return sheets
 
-    # Standard Calls template columns (exact spelling)
-    template_cols = ['hub', 'model', 'customer_name', 'mobile_number', 'opportunity_id', 'trscheduleactual']
 
-    for sheet_name, df in all_sheets.items():
-        # ✅ Rename 'opportunityid' to 'opportunity_id' if present
-        df.rename(columns=lambda x: "opportunity_id" if isinstance(x, str) and x.strip().lower() == "opportunityid" else x, inplace=True)
-
-        # Mobile cleanup
-        mobile_candidates = [col for col in df.columns if isinstance(col, str) and col.lower().replace(' ', '') in (
-            'mobilenumber', 'mobile', 'mobile_no', 'mobileno', 'contactnumber'
-        )]
-        mobile_col = mobile_candidates[0] if mobile_candidates else None
-
-        if mobile_col:
-            df[mobile_col] = [clean_mobile_number(raw, idx, logs) for idx, raw in df[mobile_col].items()]
-
-        # Name cleanup
-        name_candidates = [col for col in df.columns if isinstance(col, str) and col.lower().replace(' ', '') in (
-            'customername', 'customer', 'buyername', 'name'
-        )]
-        if name_candidates:
-            name_col = name_candidates[0]
-            df[name_col] = [clean_customer_name(raw, idx, logs) for idx, raw in df[name_col].items()]
-
-        # Date formatting detection
-        date_candidates = [col for col in df.columns if isinstance(col, str) and "date" in col.lower()]
-        for col in df.columns:
-            sample_vals = df[col].dropna().astype(str).head(10)
-            if any(looks_like_date(v) for v in sample_vals):
-                if col not in date_candidates:
-                    date_candidates.append(col)
-        for dcol in date_candidates:
+# ====================================================
+# Parsed-input Cache & Columnar Files
+# ====================================================
+# Per-user, never the shared temp dir: entries are unpickled when read
+INPUT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                               "revolt_input_cache")
+INPUT_CACHE_MAX_MB = 512
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None or importlib.util.find_spec("fastparquet") is not None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _same_frame(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    """Equal labels, dtypes and values, and the same Python types in object columns (None vs NaN matters)."""
+    if not (a.columns.equals(b.columns) and a.index.equals(b.index) and list(a.dtypes) == list(b.dtypes)):
+        return False
+    for pos in range(a.shape[1]):
+        left, right = a.iloc[:, pos], b.iloc[:, pos]
+        if not left.equals(right):
+            return False
+        if left.dtype == object and any(type(x) is not type(y) for x, y in zip(left.to_numpy(), right.to_numpy())):
+            return False
+    return True
+
+
+class InputCache:
+    """
+    Parsed input sheets on disk, keyed by the file's content hash and the read
+    options, so re-running an upload (e.g. with another cutoff date) skips the
+    Excel parse. Sheets are stored as Parquet when a Parquet engine is
+    installed and the sheet reads back identical, else as pickles. Entries are
+    evicted least recently used first once the cache exceeds max_mb.
+
+    Since entries are unpickled, the directory is created with mode 0700 and
+    only used while it is a real directory owned by the current user that
+    nobody else can access; otherwise inputs are parsed without the cache.
+    """
+
+    def __init__(self, cache_dir: str = INPUT_CACHE_DIR, max_mb: float = INPUT_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 2**20)
+
+    def private(self) -> bool:
+        """Create the cache directory if needed; True if it is safe to read from and write to."""
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            info = os.lstat(self.cache_dir)
+            if not stat.S_ISDIR(info.st_mode):
+                return False
+            if hasattr(os, "getuid"):
+                if info.st_uid != os.getuid():
+                    return False
+                if info.st_mode & 0o077:
+                    os.chmod(self.cache_dir, 0o700)
+        except OSError:
+            return False
+        return True
+
+    def key(self, input_file_path: str, selective: bool, engine: Optional[str]) -> str:
+        if selective:
+            engine = engine or preferred_excel_engine()
+        options = f"{pd.__version__}|{selective}|{engine}|{os.path.splitext(input_file_path)[1].lower()}"
+        return hashlib.sha256(f"{file_sha256(input_file_path)}|{options}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, pd.DataFrame]]:
+        if not self.private():
+            return None
+        entry = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry, "manifest.pkl")
+        try:
+            manifest = pd.read_pickle(manifest_path)
+            sheets = {}
+            for sheet_name, file_name in manifest:
+                path = os.path.join(entry, file_name)
+                sheets[sheet_name] = pd.read_parquet(path) if file_name.endswith(".parquet") else pd.read_pickle(path)
+        except Exception:
+            return None
+        os.utime(manifest_path)  # mark as recently used
+        return sheets
+
+    def put(self, key: str, sheets: Dict[str, pd.DataFrame]) -> None:
+        if not self.private():
+            return
+        partial = tempfile.mkdtemp(prefix=f"partial_{key[:16]}_", dir=self.cache_dir)
+        manifest = []
+        for pos, (sheet_name, df) in enumerate(sheets.items()):
+            manifest.append((sheet_name, self._write_sheet(df, os.path.join(partial, str(pos)))))
+        pd.to_pickle(manifest, os.path.join(partial, "manifest.pkl"))
+        try:
+            os.replace(partial, os.path.join(self.cache_dir, key))
+        except OSError:  # another run cached the same input first
+            shutil.rmtree(partial, ignore_errors=True)
+        self.evict()
+
+    @staticmethod
+    def _write_sheet(df: pd.DataFrame, stem: str) -> str:
+        if parquet_available():
             try:
-                df = format_date_column(df, dcol)
+                df.to_parquet(stem + ".parquet")
+                if _same_frame(df, pd.read_parquet(stem + ".parquet")):
+                    return os.path.basename(stem) + ".parquet"
             except Exception:
                 pass
+            if os.path.exists(stem + ".parquet"):
+                os.remove(stem + ".parquet")
+        df.to_pickle(stem + ".pkl")
+        return os.path.basename(stem) + ".pkl"
 
-        # ====================================================
-        # Blocklist filtering (applies to both sheets equally)
-        # ====================================================
-        if apply_blocklist and mobile_col:
-            blocklist_df = load_blocklist(blocklist_file)
-            blocklist_df["DateAdded"] = pd.to_datetime(blocklist_df["DateAdded"], errors="coerce")
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            manifest_path = os.path.join(entry, "manifest.pkl")
+            if name.startswith("partial_") or not os.path.exists(manifest_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(manifest_path), size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
 
-            if cutoff_date:
-                cutoff_dt = pd.to_datetime(cutoff_date)
-                blocklist_df = blocklist_df[blocklist_df["DateAdded"] <= cutoff_dt]
+    def read(self, input_file_path: str, selective: bool = False, engine: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """read_input_sheets through the cache."""
+        key = self.key(input_file_path, selective, engine)
+        sheets = self.get(key)
+        if sheets is None:
+            sheets = read_input_sheets(input_file_path, selective=selective, engine=engine)
+            self.put(key, sheets)
+        return sheets
 
-            existing_mobiles = set(blocklist_df["Mobile"].astype(str))
-            flagged = df[df[mobile_col].astype(str).isin(existing_mobiles)]
 
-            # Log blocklist matches
-            for idx, row in flagged.iterrows():
-                logs.append({"index": idx, "original": row[mobile_col], "cleaned": "", "reason": "blocklist_match"})
+def read_input(input_file_path: str, selective: bool = False, engine: Optional[str] = None,
+               input_cache: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """read_input_sheets, through an InputCache in `input_cache` when given."""
+    if input_cache is None:
+        return read_input_sheets(input_file_path, selective=selective, engine=engine)
+    return InputCache(input_cache).read(input_file_path, selective=selective, engine=engine)
 
-            # Save flagged list
-            flagged[mobile_col].to_csv(flagged_log_path, index=False, header=False)
 
-            # Remove blocked numbers from main DataFrame
-            df = df[~df[mobile_col].astype(str).isin(existing_mobiles)]
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
 
-            # Identify *new* mobile numbers not already in blocklist
-            new_mobiles = set(df[mobile_col].astype(str)) - existing_mobiles
-            new_numbers = len(new_mobiles)
 
-            # Append only new numbers to blocklist file
-            if new_numbers > 0:
-                new_entries = pd.DataFrame({
-                    "Mobile": list(new_mobiles),
-                    "DateAdded": datetime.today().strftime("%Y-%m-%d")
-                })
-                new_entries.to_csv(blocklist_file, mode="a", index=False, header=False)
+def write_columnar(aligned: pd.DataFrame, target, fmt: str) -> None:
+    """
+    Write a template-aligned frame as CSV or Parquet (path or binary buffer).
+    For Parquet, object columns mixing types (text and dates, say) are written
+    as text, since a Parquet column has a single type.
+    """
+    if fmt == "csv":
+        text = aligned.to_csv(index=False)
+        if isinstance(target, str):
+            with open(target, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+        else:
+            target.write(text.encode("utf-8"))
+        return
+    if fmt != "parquet":
+        raise ValueError(f"Unsupported output format: {fmt}")
+    if not parquet_available():
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow)")
+    frame = aligned.copy()
+    for col in frame.columns:
+        values = frame[col]
+        if values.dtype == object and values.dropna().map(type).nunique() > 1:
+            frame[col] = values.where(values.isna(), values.astype(str))
+    frame.to_parquet(target, index=False)
 
-        cleaned_sheets[sheet_name] = df
 
-    # ====================================================
-    # Create the two required outputs using Calls structure
-    # ====================================================
-    today_str = datetime.today().strftime("%d %b").lstrip("0")
+# ====================================================
+# Stage Instrumentation (optional)
+# ====================================================
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (/proc on Linux, else the peak from getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
-    # Helper to coerce and align a dataframe to template columns
-    def align_to_template(df: pd.DataFrame, template_cols: List[str]) -> pd.DataFrame:
-        # If mobile column present under other name, rename to mobile_number
-        possible_mobile_cols = [c for c in df.columns if isinstance(c, str) and c.lower().replace(' ', '') in ('mobilenumber', 'mobile', 'mobile_no', 'mobileno', 'contactnumber')]
-        if possible_mobile_cols:
-            if 'mobile_number' not in df.columns:
-                df.rename(columns={possible_mobile_cols[0]: 'mobile_number'}, inplace=True)
-        # If name column present under other name, rename to customer_name
-        possible_name_cols = [c for c in df.columns if isinstance(c, str) and c.lower().replace(' ', '') in ('customername','customer','buyername','name')]
-        if possible_name_cols:
-            if 'customer_name' not in df.columns:
-                df.rename(columns={possible_name_cols[0]: 'customer_name'}, inplace=True)
-        # If opportunity_id exists as opportunity_id already ensured earlier
-        # Ensure all template columns exist
-        for col in template_cols:
-            if col not in df.columns:
-                df[col] = ""
-        # Keep only template columns in the exact order
-        return df[template_cols]
 
-    for sheet_name, df in cleaned_sheets.items():
-        sname = sheet_name.strip()
+class PeakRss:
+    """Peak RSS (MB) while running, sampled on a background thread; use as a context manager or start()/stop()."""
 
-        # For Feedback sheet, override trscheduleactual with trcompleteddate if present
-        if sname == "TR_Completed_Y-5_to_Y":
-            if 'trcompleteddate' in df.columns:
-                df['trscheduleactual'] = df['trcompleteddate']
-            # else keep whatever trscheduleactual is (or blank)
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = self.peak_mb = 0.0
+        self._done: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
 
-        # Align columns
-        aligned = align_to_template(df.copy(), template_cols)
+    def start(self) -> "PeakRss":
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._done = threading.Event()
 
-        # Save only if it's one of the two target sheets
-        if sname == "Upcoming_TR_Today_to_Today+3":
-            reminder_file = f"Revolt TD Reminder {today_str}.xlsx"
-            with pd.ExcelWriter(reminder_file, engine="xlsxwriter") as writer:
-                aligned.to_excel(writer, sheet_name="Calls", index=False)
-            outputs["reminder"] = os.path.abspath(reminder_file)
-
-        elif sname == "TR_Completed_Y-5_to_Y":
-            feedback_file = f"Revolt TD Feedback {today_str}.xlsx"
-            with pd.ExcelWriter(feedback_file, engine="xlsxwriter") as writer:
-                aligned.to_excel(writer, sheet_name="Calls", index=False)
-            outputs["feedback"] = os.path.abspath(feedback_file)
+        def sample():
+            while not self._done.wait(self.interval):
+                self.peak_mb = max(self.peak_mb, current_rss_mb())
 
-    # Save flagged log
-    with open(flagged_log_path, "w", encoding="utf-8") as f:
-        f.write("index,original,cleaned,reason\n")
-        for entry in logs:
-            idx = entry.get("index", "")
-            orig = str(entry.get("original", "")).replace('\n', ' ').replace(',', ' ')
-            cleaned = entry.get("cleaned", entry.get("cleaned_mobile", ""))
-            reason = entry.get("reason", "")
-            f.write(f"{idx},{orig},{cleaned},{reason}\n")
-
-    # Summary counts
-    name_fixes = sum(1 for log in logs if log.get("reason") == "name_cleaned")
-    mobile_fixes = sum(1 for log in logs if log.get("reason") == "mobile_cleaned")
-    invalid_cases = sum(1 for log in logs if log.get("reason") in (
-        "empty_or_invalid_input", "numeric", "no_vowels", "too_short",
-        "purely_numeric_after_removal", "no_valid_characters_after_cleaning",
-        "mobile_is_na", "too_short_digits", "blocklist_match"
-    ))
-
-    return {
-        "new_numbers": new_numbers,
-        "name_fixes": name_fixes,
-        "mobile_fixes": mobile_fixes,
-        "invalid_cases": invalid_cases,
-        "outputs": outputs,
-        "flagged_log": os.path.abspath(flagged_log_path)
+        self._thread = threading.Thread(target=sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "PeakRss":
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self._thread = None
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return self
+
+    def __enter__(self) -> "PeakRss":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class StageTimer:
+    """
+    Wall time, rows processed and peak memory growth per pipeline stage.
+
+    Repeated stages (one "clean_names" per sheet, per chunk, ...) accumulate time
+    and rows and keep the largest memory growth. Memory is sampled on a
+    background thread only while a stage runs (track_memory=False skips it).
+    `hook(stage_name)`, if given, returns a context manager wrapped around each
+    stage, e.g. profile_stages(cProfile.Profile()). `progress(stage_name, rows)`,
+    if given, is called as each stage starts; an exception it raises aborts the run.
+    """
+
+    def __init__(self, track_memory: bool = True, hook: Optional[Callable[[str], ContextManager]] = None,
+                 sample_interval: float = 0.01, progress: Optional[Callable[[str, int], None]] = None):
+        self.track_memory = track_memory
+        self.hook = hook
+        self.progress = progress
+        self.sample_interval = sample_interval
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, name: str) -> Dict[str, float]:
+        return self.stages.setdefault(name, {"seconds": 0.0, "rows": 0, "peak_mem_delta_mb": 0.0})
+
+    def add_rows(self, name: str, rows: int) -> None:
+        self._entry(name)["rows"] += int(rows)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        if self.progress is not None:
+            self.progress(name, int(rows))
+        rss = PeakRss(self.sample_interval).start() if self.track_memory else None
+        start = time.perf_counter()
+        try:
+            with self.hook(name) if self.hook else nullcontext():
+                yield
+        finally:
+            seconds = time.perf_counter() - start
+            entry = self._entry(name)
+            entry["seconds"] += seconds
+            entry["rows"] += int(rows)
+            if rss is not None:
+                rss.stop()
+                entry["peak_mem_delta_mb"] = max(entry["peak_mem_delta_mb"], rss.peak_mb - rss.start_mb)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {"seconds", "rows", "peak_mem_delta_mb"}} in the order stages first ran."""
+        return {
+            name: {"seconds": round(e["seconds"], 4), "rows": e["rows"],
+                   "peak_mem_delta_mb": round(e["peak_mem_delta_mb"], 1)}
+            for name, e in self.stages.items()
+        }
+
+
+def timed(timer: Optional[StageTimer], name: str, rows: int = 0) -> ContextManager:
+    """timer.stage(...) or a no-op when instrumentation is off."""
+    return timer.stage(name, rows) if timer is not None else nullcontext()
+
+
+def profile_stages(profiler) -> Callable[[str], ContextManager]:
+    """Stage hook that enables `profiler` (e.g. cProfile.Profile()) only while stages run."""
+    @contextmanager
+    def hook(name: str):
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+    return hook
+
+
+# ====================================================
+# Per-sheet Pipeline Steps (shared by process_file and streaming)
+# ====================================================
+def rename_opportunity_id(df: pd.DataFrame) -> SheetSchema:
+    """Rename 'opportunityid' to 'opportunity_id' if present; returns the sheet's schema."""
+    schema = resolve_schema(df.columns)
+    if schema.renames:
+        df.rename(columns=schema.renames, inplace=True)
+    return schema
+
+
+def clean_sheet_columns(df: pd.DataFrame, log: FlaggedLog, vectorized: bool = True,
+                        name_log: Optional[FlaggedLog] = None, timer: Optional[StageTimer] = None) -> Optional[str]:
+    """
+    Rename opportunityid and clean the mobile and name columns in place.
+    Name log entries go to `name_log` when given (else `log`). Returns the mobile column.
+    """
+    name_log = log if name_log is None else name_log
+
+    schema = rename_opportunity_id(df)
+
+    # Mobile cleanup
+    mobile_col = schema.mobile_col
+
+    if mobile_col:
+        with timed(timer, "clean_mobiles", len(df)):
+            if vectorized:
+                df[mobile_col] = clean_mobile_numbers(df[mobile_col], log)
+            else:
+                df[mobile_col] = [clean_mobile_number(raw, idx, log) for idx, raw in df[mobile_col].items()]
+
+    # Name cleanup
+    name_col = schema.name_col
+    if name_col:
+        with timed(timer, "clean_names", len(df)):
+            if vectorized:
+                df[name_col] = clean_customer_names(df[name_col], name_log)
+            else:
+                df[name_col] = [clean_customer_name(raw, idx, name_log) for idx, raw in df[name_col].items()]
+
+    return mobile_col
+
+
+def detect_date_columns(df: pd.DataFrame, vectorized: bool = True) -> List[str]:
+    if vectorized:
+        return find_date_columns(df)
+    date_candidates = [col for col in df.columns if isinstance(col, str) and "date" in col.lower()]
+    for col in df.columns:
+        if col in NON_DATE_FIELDS:
+            continue
+        sample_vals = df[col].dropna().astype(str).head(10)
+        if any(looks_like_date(v) for v in sample_vals):
+            if col not in date_candidates:
+                date_candidates.append(col)
+    return date_candidates
+
+
+def format_sheet_dates(df: pd.DataFrame, date_candidates: List[str], vectorized: bool = True) -> pd.DataFrame:
+    for dcol in date_candidates:
+        try:
+            if vectorized:
+                df[dcol] = format_dates(df[dcol])
+            else:
+                df = format_date_column(df, dcol)
+        except Exception:
+            pass
+    return df
+
+
+def filter_blocklisted(df: pd.DataFrame, mobile_col: str, blocklist: BlocklistStore,
+                       cutoff_date: Optional[datetime], log: FlaggedLog):
+    """Drop (and log) rows whose mobile is blocklisted. Returns (kept_df, flagged_df, new_mobiles)."""
+    mobiles = df[mobile_col]
+    if not isinstance(mobiles.dtype, pd.StringDtype):  # cleaned mobiles already are text
+        mobiles = mobiles.astype(str)
+    blocked = blocklist.contains(mobiles, cutoff_date)
+    kept = ~blocked
+    flagged = df[blocked]
+
+    # Log blocklist matches
+    log.extend(flagged.index, flagged[mobile_col].to_numpy(dtype=object), "blocklist_match")
+
+    # Every remaining number is *new* (not in the blocklist as of cutoff)
+    return df[kept], flagged, pd.unique(mobiles[kept])
+
+
+def align_to_template(df: pd.DataFrame, template_cols: List[str]) -> pd.DataFrame:
+    # Mobile / name columns present under other names become mobile_number / customer_name
+    schema = resolve_schema(df.columns)
+    renames = {source: field for field, source in schema.fields.items() if source != field}
+    if renames:
+        df.rename(columns=renames, inplace=True)
+    # If opportunity_id exists as opportunity_id already ensured earlier
+    # Ensure all template columns exist
+    for col in template_cols:
+        if col not in df.columns:
+            df[col] = ""
+    # Keep only template columns in the exact order
+    return df[template_cols]
+
+
+CALLS_SHEET = "Calls"
+CONSTANT_MEMORY_ROWS = 100_000
+DATE_CELL_TYPES = ("datetime", "datetime64", "date", "mixed", "mixed-integer")
+
+
+def write_calls_workbook(aligned: pd.DataFrame, target, constant_memory: Optional[bool] = None) -> None:
+    """
+    Write `aligned` as the "Calls" sheet of an xlsx workbook at `target` (a path
+    or a binary buffer), with the same cells as to_excel(index=False).
+
+    Rows go out strictly in order, so big sheets (CONSTANT_MEMORY_ROWS and up,
+    or constant_memory=True) use xlsxwriter's constant_memory mode, which keeps
+    one row in memory at a time; smaller sheets are assembled fully in memory.
+    """
+    if constant_memory is None:
+        constant_memory = len(aligned) >= CONSTANT_MEMORY_ROWS
+    options = {"constant_memory": True} if constant_memory else {"in_memory": True}
+
+    values = aligned.astype(object).where(aligned.notna(), None)
+    date_cols, inf_cols = [], []
+    for pos, col in enumerate(aligned.columns):
+        column = aligned.iloc[:, pos]
+        if pd.api.types.infer_dtype(column, skipna=True) in DATE_CELL_TYPES:
+            date_cols.append(pos)
+        elif pd.api.types.is_float_dtype(column) and np.isinf(column.to_numpy()).any():
+            inf_cols.append(pos)
+    for pos in inf_cols:
+        column = values.iloc[:, pos]
+        values.iloc[:, pos] = column.mask(column == np.inf, "inf").mask(column == -np.inf, "-inf")
+
+    with xlsxwriter.Workbook(target, options) as workbook:
+        sheet = workbook.add_worksheet(CALLS_SHEET)
+        sheet.write_row(0, 0, list(aligned.columns))
+        rows = values.itertuples(index=False, name=None)
+        if not date_cols:
+            for row_num, row in enumerate(rows, start=1):
+                sheet.write_row(row_num, 0, row)
+            return
+        # Timestamps get the same number formats pandas uses
+        datetime_format = workbook.add_format({"num_format": "YYYY-MM-DD HH:MM:SS"})
+        date_format = workbook.add_format({"num_format": "YYYY-MM-DD"})
+        for row_num, row in enumerate(rows, start=1):
+            for col_num, value in enumerate(row):
+                if isinstance(value, datetime):
+                    sheet.write_datetime(row_num, col_num, value, datetime_format)
+                elif isinstance(value, date):
+                    sheet.write_datetime(row_num, col_num, value, date_format)
+                else:
+                    sheet.write(row_num, col_num, value)
+
+
+def template_source_columns(columns) -> List:
+    """Columns of a cleaned sheet that align_to_template carries into the output."""
+    return resolve_schema(columns).source_columns
+
+
+# ====================================================
+# Parallel Sheet Processing (opt-in process pool)
+# ====================================================
+PARTITION_ROWS = 100_000
+
+
+def sniff_sheet_date_columns(df: pd.DataFrame, vectorized: bool = True, step: int = 1_000) -> List:
+    """
+    The date columns detect_date_columns would pick for the cleaned sheet, found
+    by cleaning only as many leading rows as it takes to settle every column.
+    """
+    sniffer = DateColumnSniffer()
+    for start in range(0, max(len(df), 1), step):
+        head = df.iloc[start:start + step].copy()
+        clean_sheet_columns(head, FlaggedLog(), vectorized)
+        sniffer.update(head, list(head.columns))
+        if sniffer.settled(head.columns):
+            break
+    return sniffer.date_columns(head.columns)
+
+
+def _clean_partition(part: pd.DataFrame, vectorized: bool, date_cols: List):
+    """Worker task: clean one row range. Returns (part, mobile_col, mobile_log, name_log)."""
+    mobile_log, name_log = FlaggedLog(), FlaggedLog()
+    mobile_col = clean_sheet_columns(part, mobile_log, vectorized, name_log=name_log)
+    return format_sheet_dates(part, date_cols, vectorized), mobile_col, mobile_log, name_log
+
+
+def iter_cleaned_sheets(sheets: Dict[str, pd.DataFrame], log: FlaggedLog, vectorized: bool = True,
+                        workers: Optional[int] = None, partition_rows: int = PARTITION_ROWS,
+                        timer: Optional[StageTimer] = None):
+    """
+    Yield (sheet_name, cleaned_df, mobile_col) in sheet order, adding each sheet's
+    cleaning entries to `log` just before it is yielded.
+
+    With workers > 1 every sheet is split into partition_rows-row ranges and all
+    ranges of all sheets are cleaned on a process pool. Date columns are decided
+    per sheet up front, and ranges are stitched back in row order, so frames and
+    log match the serial run. `timer` then sees the pool work as one
+    "clean_parallel" stage per sheet (time spent waiting on the workers).
+    """
+    if not workers or workers <= 1:
+        for sheet_name, df in sheets.items():
+            mobile_col = clean_sheet_columns(df, log, vectorized, timer=timer)
+            with timed(timer, "dates", len(df)):
+                df = format_sheet_dates(df, detect_date_columns(df, vectorized), vectorized)
+            yield sheet_name, df, mobile_col
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_name_blacklist,
+                             initargs=(NAME_MATCHER,)) as pool:
+        pending = {}
+        for sheet_name, df in sheets.items():
+            with timed(timer, "dates"):
+                date_cols = sniff_sheet_date_columns(df, vectorized)
+            pending[sheet_name] = [
+                pool.submit(_clean_partition, df.iloc[start:start + partition_rows], vectorized, date_cols)
+                for start in range(0, max(len(df), 1), partition_rows)
+            ]
+        for sheet_name, futures in pending.items():
+            with timed(timer, "clean_parallel", len(sheets[sheet_name])):
+                results = [future.result() for future in futures]
+            # Serial order: the whole sheet's mobile entries, then its name entries
+            for _, _, mobile_log, _ in results:
+                log.merge(mobile_log)
+            for _, _, _, name_log in results:
+                log.merge(name_log)
+            parts = [part for part, _, _, _ in results]
+            df = parts[0] if len(parts) == 1 else pd.concat(parts)
+            yield sheet_name, df, results[0][1]
+
+
+# ====================================================
+# Incremental Processing (row fingerprint store)
+# ====================================================
+ROW_STORE_FILE = "cleaned_rows_store.pkl"
+ROW_STORE_MAX_AGE_DAYS = 30
+# Bump when cleaning logic changes in a way the rule lists below don't show
+CLEANING_RULES_VERSION = 1
+FINGERPRINT_DATE_COLUMNS = ("trscheduleactual", "trcompleteddate")
+ROW_STORE_FIELDS = ["mobile", "mobile_reason", "mobile_detail",
+                    "name", "name_reason", "name_logged", "name_detail"] + list(FINGERPRINT_DATE_COLUMNS)
+
+
+def cleaning_rules_digest() -> str:
+    """Digest of everything that decides a cleaned value; stored results are dropped when it changes."""
+    rules = (
+        CLEANING_RULES_VERSION, BIKE_MODELS_TO_REMOVE, NAME_MATCHER.terms, LOG_REASONS, MOBILE_REASONS,
+        DATE_OUTPUT_FORMAT,
+        [rx.pattern for rx in (BIKE_MODEL_RE, DASH_RE, SYMBOL_RE, WHITESPACE_RE, DIGITS_ONLY_RE, NON_NAME_CHAR_RE,
+                               CAMEL_CASE_RE, WORD_RE, VOWEL_RE, MOBILE_PREFIX_RE, NON_DIGIT_RE)],
+    )
+    return hashlib.sha256(repr(rules).encode("utf-8")).hexdigest()
+
+
+def row_fingerprints(df: pd.DataFrame, columns: List) -> np.ndarray:
+    """
+    uint64 fingerprint per row over the raw values of `columns` (None = column
+    absent). Value types are part of the fingerprint, since 98765 and "98765"
+    can clean differently.
+    """
+    parts = {}
+    for pos, col in enumerate(columns):
+        if col is None or col not in df.columns:
+            parts[pos] = "<absent>"
+            continue
+        values = df[col]
+        parts[pos] = values
+        if values.dtype == object:
+            parts[f"{pos}:type"] = [type(v).__name__ for v in values.to_numpy()]
+        else:
+            parts[f"{pos}:type"] = str(values.dtype)
+    return pd.util.hash_pandas_object(pd.DataFrame(parts, index=df.index), index=False).to_numpy()
+
+
+class RowStore:
+    """
+    Cleaned results of previously seen rows, keyed by row fingerprint.
+
+    Kept in a local pickle together with cleaning_rules_digest(); a store made
+    under other rules loads empty. Entries not seen for max_age_days are
+    dropped on save. RowStore.invalidate(path) deletes the store outright.
+    """
+
+    def __init__(self, path: Optional[str] = ROW_STORE_FILE, max_age_days: int = ROW_STORE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.keys = pd.Index(np.array([], dtype=np.uint64))
+        self.values = pd.DataFrame({field: np.array([], dtype=object) for field in ROW_STORE_FIELDS})
+        self.last_seen = np.array([], dtype="datetime64[D]")
+
+    @classmethod
+    def load(cls, path: str = ROW_STORE_FILE, max_age_days: int = ROW_STORE_MAX_AGE_DAYS) -> "RowStore":
+        store = cls(path, max_age_days)
+        if os.path.exists(path):
+            try:
+                saved = pd.read_pickle(path)
+            except Exception:
+                saved = None
+            if isinstance(saved, dict) and saved.get("rules") == cleaning_rules_digest():
+                store.keys = pd.Index(saved["keys"])
+                store.values = saved["values"]
+                store.last_seen = saved["last_seen"]
+        return store
+
+    @staticmethod
+    def invalidate(path: str = ROW_STORE_FILE) -> None:
+        """Forget every stored result (e.g. after changing the cleaning rules)."""
+        if os.path.exists(path):
+            os.remove(path)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Position of each key in the store, -1 when unseen. Marks hits as seen today."""
+        found = self.keys.get_indexer(keys) if len(self.keys) else np.full(len(keys), -1, dtype=np.intp)
+        self.last_seen[found[found >= 0]] = np.datetime64(datetime.today().date(), "D")
+        return found
+
+    def add(self, keys: np.ndarray, values: pd.DataFrame) -> None:
+        """Store results for new keys (first occurrence wins for repeated keys)."""
+        first = np.sort(np.unique(keys, return_index=True)[1])
+        new = first[~pd.Index(keys[first]).isin(self.keys)]
+        if not len(new):
+            return
+        self.keys = self.keys.append(pd.Index(keys[new]))
+        self.values = pd.concat([self.values, values.iloc[new]], ignore_index=True)
+        today = np.datetime64(datetime.today().date(), "D")
+        self.last_seen = np.concatenate([self.last_seen, np.full(len(new), today)])
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        cutoff = np.datetime64(datetime.today().date(), "D") - np.timedelta64(self.max_age_days, "D")
+        fresh = self.last_seen >= cutoff
+        partial = self.path + ".partial"
+        pd.to_pickle({
+            "rules": cleaning_rules_digest(),
+            "keys": self.keys[fresh].to_numpy(),
+            "values": self.values[fresh].reset_index(drop=True),
+            "last_seen": self.last_seen[fresh],
+        }, partial)
+        os.replace(partial, self.path)
+
+
+def _stored_or_fresh(stored: pd.Series, fresh: pd.Series, found: np.ndarray) -> np.ndarray:
+    out = np.empty(len(found), dtype=object)
+    hit = found >= 0
+    out[hit] = stored.to_numpy()[found[hit]]
+    out[~hit] = fresh.to_numpy()
+    return out
+
+
+def clean_sheet_incremental(df: pd.DataFrame, log: FlaggedLog, store: RowStore,
+                            timer: Optional[StageTimer] = None):
+    """
+    clean_sheet_columns + date formatting, reusing `store` results for rows
+    whose opportunity_id, raw name, mobile and date values were seen before.
+    Only unseen rows are cleaned (and then stored); values and log entries
+    come out exactly as from a full run. Returns (df, mobile_col, reused_rows).
+    """
+    schema = rename_opportunity_id(df)
+    mobile_col, name_col = schema.mobile_col, schema.name_col
+    date_keys = [col for col in FINGERPRINT_DATE_COLUMNS if col in df.columns]
+
+    with timed(timer, "fingerprint", len(df)):
+        keys = row_fingerprints(df, ["opportunity_id", name_col, mobile_col, *FINGERPRINT_DATE_COLUMNS])
+        found = store.lookup(keys)
+    new_rows = found < 0
+    stored = store.values
+    fresh = pd.DataFrame(index=df.index[new_rows], columns=ROW_STORE_FIELDS, dtype=object)
+
+    if mobile_col:
+        with timed(timer, "clean_mobiles", int(new_rows.sum())):
+            result = normalize_mobile_numbers(df[mobile_col][new_rows])
+            fresh["mobile"] = result["mobile"].astype(object)
+            fresh["mobile_reason"] = result["reason"].astype(object).where(result["reason"].notna(), None)
+            fresh["mobile_detail"] = result["digits"]
+            merged = pd.DataFrame({
+                "mobile": _stored_or_fresh(stored["mobile"], fresh["mobile"], found),
+                "reason": pd.Categorical(_stored_or_fresh(stored["mobile_reason"], fresh["mobile_reason"], found),
+                                         categories=MOBILE_REASONS),
+                "digits": _stored_or_fresh(stored["mobile_detail"], fresh["mobile_detail"], found),
+            }, index=df.index)
+            df[mobile_col] = log_mobile_numbers(df[mobile_col], merged, log)
+
+    if name_col:
+        with timed(timer, "clean_names", int(new_rows.sum())):
+            result = normalize_customer_names(df[name_col][new_rows])
+            fresh["name"], fresh["name_reason"] = result["name"], result["reason"]
+            fresh["name_logged"], fresh["name_detail"] = result["logged"], result["detail"]
+            merged = pd.DataFrame({
+                field: _stored_or_fresh(stored["name_" + field if field != "name" else "name"],
+                                        fresh["name_" + field if field != "name" else "name"], found)
+                for field in ("name", "reason", "logged", "detail")
+            }, index=df.index, dtype=object)
+            df[name_col] = log_customer_names(df[name_col], merged, log)
+
+    with timed(timer, "dates", len(df)):
+        date_cols = detect_date_columns(df)
+        for dcol in date_cols:
+            if dcol not in date_keys:
+                df = format_sheet_dates(df, [dcol])
+                continue
+            labels = np.empty(len(df), dtype=object)
+            hit = found >= 0
+            labels[hit] = stored[dcol].to_numpy()[found[hit]]
+            need = pd.isna(labels)  # unseen rows, or stored while the column wasn't a date column
+            try:
+                labels[need] = format_dates(df[dcol][need]).to_numpy()
+            except Exception:
+                df = format_sheet_dates(df, [dcol])
+                continue
+            fresh[dcol] = labels[new_rows]
+            df[dcol] = pd.Series(labels, index=df.index, dtype=object)
+
+    store.add(keys[new_rows], fresh.reset_index(drop=True))
+    return df, mobile_col, int((~new_rows).sum())
+
+
+def iter_incremental_sheets(sheets: Dict[str, pd.DataFrame], log: FlaggedLog, store: RowStore,
+                            counts: Dict[str, int], timer: Optional[StageTimer] = None):
+    """iter_cleaned_sheets through clean_sheet_incremental; tallies reused/cleaned rows into `counts`."""
+    for sheet_name, df in sheets.items():
+        df, mobile_col, reused = clean_sheet_incremental(df, log, store, timer=timer)
+        counts["reused"] += reused
+        counts["cleaned"] += len(df) - reused
+        yield sheet_name, df, mobile_col
+
+
+# ====================================================
+# Prepared Input (read + clean ahead of the blocklist steps)
+# ====================================================
+def prepare_input(input_file_path: str, vectorized: bool = True, selective_read: bool = False,
+                  excel_engine: Optional[str] = None, instrument: bool = False,
+                  input_cache: Optional[str] = None) -> Dict:
+    """
+    Read and clean a file without touching the blocklist or writing anything,
+    for process_file(..., prepared=...) to finish. The result is picklable, so
+    several files can be prepared on a process pool while the blocklist steps
+    run file by file.
+    """
+    if not os.path.exists(input_file_path):
+        raise FileNotFoundError(f"Input file not found: {input_file_path}")
+    timer = StageTimer() if instrument else None
+    with timed(timer, "read"):
+        all_sheets = read_input(input_file_path, selective=selective_read, engine=excel_engine,
+                                input_cache=input_cache)
+    rows = {sheet_name: {"input": len(df), "output": len(df)} for sheet_name, df in all_sheets.items()}
+    if timer:
+        timer.add_rows("read", sum(counts["input"] for counts in rows.values()))
+
+    sheets = []
+    for sheet_name, df in all_sheets.items():
+        # Each sheet keeps its own cleaning log, merged back in sheet order by process_file
+        sheet_log = FlaggedLog()
+        for _, cleaned, mobile_col in iter_cleaned_sheets({sheet_name: df}, sheet_log, vectorized, timer=timer):
+            sheets.append((sheet_name, cleaned, mobile_col, sheet_log))
+    return {"path": input_file_path, "sheets": sheets, "rows": rows,
+            "stages": timer.report() if timer else {}}
+
+
+def iter_prepared_sheets(prepared: Dict, log: FlaggedLog):
+    """iter_cleaned_sheets over prepare_input() output."""
+    for sheet_name, df, mobile_col, sheet_log in prepared["sheets"]:
+        log.merge(sheet_log)
+        yield sheet_name, df, mobile_col
+
+
+# ====================================================
+# Duplicate Lead Detection (cross-sheet hash index)
+# ====================================================
+# Which copy of a repeated lead is kept: the first seen (Reminder sheet before
+# Feedback, then row order), the one with the latest date, or a completed one
+DEDUPE_RULES = ("first", "latest", "completed")
+# Day-month labels carry no year: take the one that puts the date nearest today
+LABEL_YEAR_WINDOW_DAYS = 182
+
+
+def label_dates(values: pd.Series, today: Optional[datetime] = None) -> np.ndarray:
+    """
+    datetime64 values for a formatted date column ('7 October' labels, NaT
+    where a value isn't one). Each distinct label is parsed once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]")
+    today = pd.Timestamp(today or datetime.today()).normalize()
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    texts = pd.Index([str(label) for label in uniques], dtype=object)
+    parsed = pd.Series(pd.to_datetime(texts + f" {today.year}", format="%d %B %Y", errors="coerce"))
+    window = pd.Timedelta(days=LABEL_YEAR_WINDOW_DAYS)
+    parsed[parsed > today + window] -= pd.DateOffset(years=1)
+    parsed[parsed < today - window] += pd.DateOffset(years=1)
+    dates = parsed.to_numpy(dtype="datetime64[ns]")
+    return np.where(codes >= 0, dates[codes.clip(min=0)], np.datetime64("NaT", "ns"))
+
+
+def lead_keys(df: pd.DataFrame, mobile_col: Optional[str]) -> np.ndarray:
+    """One key per row: the cleaned mobile, else '#<opportunity_id>', else None (never a duplicate)."""
+    keys = np.full(len(df), None, dtype=object)
+    missing = np.ones(len(df), dtype=bool)
+    if mobile_col:
+        mobiles = df[mobile_col]
+        if not isinstance(mobiles.dtype, pd.StringDtype):  # cleaned mobiles already are text
+            mobiles = mobiles.astype(str)
+        keys = np.array(mobiles.to_numpy(dtype=object, na_value=None), dtype=object)
+        missing = pd.isna(keys) | (keys == "")
+        keys[missing] = None
+    if "opportunity_id" in df.columns and missing.any():
+        # Only rows without a usable mobile fall back to the opportunity id
+        opportunity = df["opportunity_id"][missing]
+        text = opportunity.astype(str).str.strip().to_numpy(dtype=object)
+        present = opportunity.notna().to_numpy() & (text != "")
+        rows = missing.nonzero()[0][present]
+        keys[rows] = "#" + text[present]
+    return keys
+
+
+def find_duplicate_leads(sheets: List[tuple], keep: str = "first", today: Optional[datetime] = None) -> List[tuple]:
+    """
+    Pick one row per lead across `sheets` ([(sheet_name, df, mobile_col)], in
+    sheet order) and return, per sheet, (drop mask, kept sheet per row, kept
+    row label per row) for the rest.
+
+    Keys from all sheets (lead_keys) are factorized once into a hash index, then
+    each key's winner is found with two linear passes: its best score under
+    `keep`, then the first row reaching it. Time and memory are linear in rows.
+    """
+    if keep not in DEDUPE_RULES:
+        raise ValueError(f"Unknown dedupe rule: {keep} (expected one of {', '.join(DEDUPE_RULES)})")
+    keys = np.concatenate([lead_keys(df, mobile_col) for _, df, mobile_col in sheets] or [np.empty(0, dtype=object)])
+    sizes = [len(df) for _, df, _ in sheets]
+    codes, uniques = pd.factorize(keys)
+    keyed = codes >= 0
+    # Rows without a key (code -1) share one spare slot and are never dropped
+    slot = np.where(keyed, codes, len(uniques))
+
+    if keep == "latest":
+        dates = []
+        for sheet_name, df, _ in sheets:
+            # The date the output shows: trcompleteddate replaces trscheduleactual on the Feedback sheet
+            col = ("trcompleteddate" if sheet_name.strip() == FEEDBACK_SHEET and "trcompleteddate" in df.columns
+                   else "trscheduleactual")
+            dates.append(label_dates(df[col], today) if col in df.columns
+                         else np.full(len(df), np.datetime64("NaT", "ns")))
+        score = np.concatenate(dates or [np.empty(0, dtype="datetime64[ns]")]).view(np.int64)
+    elif keep == "completed":
+        score = np.repeat([int(name.strip() == FEEDBACK_SHEET) for name, _, _ in sheets], sizes).astype(np.int64)
+    else:
+        score = np.zeros(len(codes), dtype=np.int64)
+
+    best = np.full(len(uniques) + 1, np.iinfo(np.int64).min)
+    np.maximum.at(best, slot, score)
+    position = np.arange(len(codes))
+    candidate = keyed & (score == best[slot])
+    winner = np.full(len(uniques) + 1, len(codes))
+    np.minimum.at(winner, slot[candidate], position[candidate])
+
+    kept_at = winner[slot]
+    drop = keyed & (kept_at != position)
+    kept_at = np.where(drop, kept_at, position)
+    names = np.array([sheet_name for sheet_name, _, _ in sheets], dtype=object)
+    sheet_of = np.repeat(np.arange(len(sheets)), sizes)
+    labels = np.concatenate([df.index.to_numpy(dtype=object) for _, df, _ in sheets] or [np.empty(0, dtype=object)])
+
+    found, offset = [], 0
+    for size in sizes:
+        rows = slice(offset, offset + size)
+        found.append((drop[rows], names[sheet_of[kept_at[rows]]], labels[kept_at[rows]]))
+        offset += size
+    return found
+
+
+def iter_deduplicated_sheets(cleaned_iter, clean_log: FlaggedLog, log: FlaggedLog, keep: str = "first",
+                             timer: Optional[StageTimer] = None):
+    """
+    iter_cleaned_sheets (or any of its variants, writing to `clean_log`) with
+    repeated leads across the two target sheets removed (find_duplicate_leads).
+    All sheets are cleaned before the first is yielded; each sheet's cleaning
+    entries, then its duplicate_lead entries, go to `log` just before it is
+    yielded, so the log reads as in a run without deduplication.
+    """
+    cleaned = [(sheet_name, df, mobile_col, clean_log.take()) for sheet_name, df, mobile_col in cleaned_iter]
+    targets = [i for i, (sheet_name, _, _, _) in enumerate(cleaned) if sheet_name.strip() in TARGET_SHEETS]
+    with timed(timer, "dedupe", sum(len(cleaned[i][1]) for i in targets)):
+        found = dict(zip(targets, find_duplicate_leads([cleaned[i][:3] for i in targets], keep)))
+    for i, (sheet_name, df, mobile_col, sheet_log) in enumerate(cleaned):
+        log.merge(sheet_log)
+        if i in found:
+            drop, kept_sheet, kept_row = found[i]
+            if drop.any():
+                keys = lead_keys(df, mobile_col)[drop]
+                detail = [f"{sheet}:{row}" for sheet, row in zip(kept_sheet[drop], kept_row[drop])]
+                log.extend(df.index[drop], np.array([key.lstrip("#") for key in keys], dtype=object),
+                           "duplicate_lead", detail=detail)
+                df = df[~drop]
+        cleaned[i] = None
+        yield sheet_name, df, mobile_col
+
+
+# ====================================================
+# Low-memory Mode (lazy narrowed reads, categoricals, budget)
+# ====================================================
+CATEGORY_COLUMNS = ("hub", "model")
+CATEGORY_MAX_RATIO = 0.5  # categorize when distinct values are at most this share of rows
+XLSX_FRAME_FACTOR = 8  # parsed frame size per byte of xlsx, roughly
+PROCESSING_OVERHEAD = 3  # peak during cleaning/writing relative to the parsed frame
+MEMORY_SAMPLE_ROWS = 1_000
+MIN_BUDGET_CHUNKSIZE = 1_000
+
+
+def categorize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Store low-cardinality pass-through text columns (hub, model) as categoricals, in place."""
+    for col in CATEGORY_COLUMNS:
+        if col not in df.columns or not isinstance(df[col], pd.Series):
+            continue
+        values = df[col]
+        if (values.dtype == object or isinstance(values.dtype, pd.StringDtype)) \
+                and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+            df[col] = values.astype("category")
+    return df
+
+
+class LazySheets:
+    """
+    Input sheets read one at a time as items() is iterated, and not kept: each
+    is parsed with only the columns the pipeline uses (SheetSchema.usecols) and
+    categorize_columns applied. rows[sheet] = {"input", "output"} fills in as
+    sheets are read.
+    """
+
+    def __init__(self, input_file_path: str, selective: bool = False, engine: Optional[str] = None,
+                 timer: Optional[StageTimer] = None):
+        self.path = input_file_path
+        self.selective = selective
+        self.engine = engine
+        self.timer = timer
+        self.rows: Dict[str, Dict[str, int]] = {}
+
+    def _parse(self, parse, **kwargs) -> pd.DataFrame:
+        schema = resolve_schema(parse(nrows=0, **kwargs).columns)
+        if not schema.usecols:  # nothing usable; keep the rows anyway
+            return parse(**kwargs)
+        dtype = schema.dtypes if self.selective else None
+        return parse(usecols=schema.usecols, dtype=dtype, **kwargs)
+
+    def items(self):
+        lower_path = self.path.lower()
+        if lower_path.endswith('.csv'):
+            with timed(self.timer, "read"):
+                df = categorize_columns(self._parse(lambda **kw: pd.read_csv(self.path, **kw)))
+            yield from self._emit("Sheet1", df)
+            return
+        if not lower_path.endswith(('.xlsx', '.xls')):
+            raise ValueError("Unsupported file format")
+        engine = self.engine or (preferred_excel_engine() if self.selective else None)
+        with pd.ExcelFile(self.path, engine=engine) as workbook:
+            for sheet_name in workbook.sheet_names:
+                if self.selective and sheet_name.strip() not in TARGET_SHEETS:
+                    continue
+                with timed(self.timer, "read"):
+                    df = categorize_columns(self._parse(lambda **kw: workbook.parse(sheet_name, **kw)))
+                yield from self._emit(sheet_name, df)
+
+    def _emit(self, sheet_name: str, df: pd.DataFrame):
+        self.rows[sheet_name] = {"input": len(df), "output": len(df)}
+        if self.timer:
+            self.timer.add_rows("read", len(df))
+        yield sheet_name, df
+
+
+def estimate_memory_mb(input_file_path: str) -> float:
+    """Rough peak memory process_file needs for a file: the parsed frame times PROCESSING_OVERHEAD."""
+    size = os.path.getsize(input_file_path)
+    if not input_file_path.lower().endswith('.csv'):
+        return size * XLSX_FRAME_FACTOR * PROCESSING_OVERHEAD / 2**20
+    return csv_row_mb(input_file_path) * estimate_csv_rows(input_file_path) * PROCESSING_OVERHEAD
+
+
+def csv_row_mb(input_file_path: str) -> float:
+    """Parsed size of one CSV row in MB, from the first MEMORY_SAMPLE_ROWS rows."""
+    sample = pd.read_csv(input_file_path, nrows=MEMORY_SAMPLE_ROWS, dtype=str)
+    if sample.empty:
+        return 0.0
+    return sample.memory_usage(deep=True).sum() / len(sample) / 2**20
+
+
+def estimate_csv_rows(input_file_path: str) -> int:
+    """Row count extrapolated from the byte length of the first MEMORY_SAMPLE_ROWS lines."""
+    with open(input_file_path, "rb") as f:
+        head = [line for _, line in zip(range(MEMORY_SAMPLE_ROWS + 1), f)]
+    sample_bytes = sum(len(line) for line in head[1:])
+    if not sample_bytes:
+        return 0
+    return int(os.path.getsize(input_file_path) / (sample_bytes / (len(head) - 1)))
+
+
+def budget_chunksize(input_file_path: str, memory_budget_mb: float) -> int:
+    """CSV rows per chunk that keep process_csv_stream within memory_budget_mb."""
+    row_mb = csv_row_mb(input_file_path) * PROCESSING_OVERHEAD
+    if row_mb <= 0:
+        return MIN_BUDGET_CHUNKSIZE
+    return max(MIN_BUDGET_CHUNKSIZE, int(memory_budget_mb / row_mb))
+
+
+# ====================================================
+# Multi-file Input (concurrent reads, merged by sheet)
+# ====================================================
+# Below this total input size, starting worker processes costs more than it saves
+PARALLEL_READ_MIN_MB = 4
+
+
+def merge_file_sheets(file_sheets: List[Dict[str, pd.DataFrame]]) -> tuple:
+    """
+    Stack several files' {sheet_name: DataFrame} by sheet (names compared
+    without surrounding spaces, first file's spelling and columns kept), then
+    drop rows whose cleaned mobile already appeared in an earlier file's copy
+    of the sheet. Duplicates within one file are left alone.
+
+    The cross-file check is a single hash index per sheet: cleaned mobiles are
+    factorized once and each key keeps the lowest file number it occurs in.
+    Returns (sheets, {sheet: input rows}, {sheet: rows dropped}).
+    """
+    groups: Dict[str, List[tuple]] = {}
+    names: Dict[str, str] = {}
+    for file_no, sheets in enumerate(file_sheets):
+        for sheet_name, df in sheets.items():
+            names.setdefault(sheet_name.strip(), sheet_name)
+            groups.setdefault(sheet_name.strip(), []).append((file_no, df))
+
+    merged, input_rows, dropped = {}, {}, {}
+    for key, frames in groups.items():
+        sheet_name = names[key]
+        first = resolve_schema(frames[0][1].columns)
+        parts = []
+        for _, df in frames:
+            schema = resolve_schema(df.columns)
+            # Same fields under the first file's headers, so columns line up when stacked
+            renames = dict(schema.renames)
+            for source, target in ((schema.mobile_col, first.mobile_col), (schema.name_col, first.name_col)):
+                if source is not None and target is not None and source != target:
+                    renames[source] = target
+            parts.append(df.rename(columns=renames) if renames else df)
+        df = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+        input_rows[sheet_name] = len(df)
+        dropped[sheet_name] = 0
+
+        mobile_col = resolve_schema(df.columns).mobile_col
+        if len(parts) > 1 and mobile_col is not None:
+            file_no = np.repeat(np.arange(len(parts)), [len(part) for part in parts])
+            mobiles = normalize_mobile_numbers(df[mobile_col])["mobile"].to_numpy(dtype=object)
+            codes, uniques = pd.factorize(mobiles)
+            first_file = np.full(len(uniques), len(parts))
+            np.minimum.at(first_file, codes, file_no)
+            repeat = (file_no > first_file[codes]) & (mobiles != "")
+            if repeat.any():
+                df = df[~repeat].reset_index(drop=True)
+                dropped[sheet_name] = int(repeat.sum())
+        merged[sheet_name] = df
+    return merged, input_rows, dropped
+
+
+def read_inputs(paths: List[str], selective: bool = False, engine: Optional[str] = None,
+                input_cache: Optional[str] = None, workers: Optional[int] = None) -> tuple:
+    """
+    read_input for several files, parsed at the same time on up to `workers`
+    processes (default: one per file, at most the CPU count), merged with
+    merge_file_sheets. Returns the same tuple.
+
+    The pool is only started when the files add up to PARALLEL_READ_MIN_MB,
+    and its processes are spawned rather than forked: this runs on the web
+    app's background thread, where forking a threaded process is unsafe.
+    """
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if sum(os.path.getsize(path) for path in paths) < PARALLEL_READ_MIN_MB * 1024 * 1024:
+        workers = 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            file_sheets = list(pool.map(read_input, paths, [selective] * len(paths), [engine] * len(paths),
+                                        [input_cache] * len(paths)))
+    else:
+        file_sheets = [read_input(path, selective=selective, engine=engine, input_cache=input_cache) for path in paths]
+    return merge_file_sheets(file_sheets)
+
+
+# ====================================================
+# Main Processing Function (preserves original behavior + dual exports)
+# ====================================================
+class RunOptions:
+    """
+    How process_file runs, grouped by mode. Every option defaults to the plain
+    serial run; outputs and the flagged log are the same in every mode unless
+    noted.
+
+    Cleaning: vectorized=False uses the original row-by-row helpers. workers=N
+    cleans partition_rows-row ranges on N processes (see iter_cleaned_sheets).
+    incremental=True reuses rows already cleaned in earlier runs from the
+    RowStore at row_store_path (adds result["incremental"]).
+
+    Reading: selective_read=True reads only the two target sheets and the
+    columns they keep (other sheets then no longer feed the blocklist or the
+    log), with excel_engine or the fastest installed reader. input_cache is a
+    directory of parsed inputs keyed by content hash (see InputCache).
+
+    Memory: stream_chunksize=N streams CSV input N rows at a time to
+    "Revolt Cleaned {date}.csv" (see process_csv_stream). low_memory=True reads
+    sheets lazily (see LazySheets) and cleans serially; memory_budget_mb
+    implies it and streams a CSV that would not fit. Either adds
+    result["memory"].
+
+    Blocklist and leads: retention_days=N expires blocklist entries older than
+    N days (adds result["expired_numbers"]). dedupe, one of DEDUPE_RULES,
+    drops repeated leads across the target sheets (see find_duplicate_leads).
+
+    Outputs: written to output_dir (default: the working directory) in each of
+    output_formats. in_memory=True returns them as result["output_bytes"] and
+    only writes to disk when output_dir / flagged_log_path is given.
+    instrument=True adds per-stage timings as result["stages"].
+    """
+
+    def __init__(self, *, vectorized: bool = True, workers: Optional[int] = None,
+                 partition_rows: int = PARTITION_ROWS, incremental: bool = False,
+                 row_store_path: str = ROW_STORE_FILE, selective_read: bool = False,
+                 excel_engine: Optional[str] = None, input_cache: Optional[str] = None,
+                 stream_chunksize: Optional[int] = None, low_memory: bool = False,
+                 memory_budget_mb: Optional[float] = None, retention_days: Optional[int] = None,
+                 dedupe: Optional[str] = None, output_dir: Optional[str] = None, output_formats=("xlsx",),
+                 in_memory: bool = False, instrument: bool = False):
+        self.vectorized = vectorized
+        self.workers = workers
+        self.partition_rows = partition_rows
+        self.incremental = incremental
+        self.row_store_path = row_store_path
+        self.selective_read = selective_read
+        self.excel_engine = excel_engine
+        self.input_cache = input_cache
+        self.stream_chunksize = stream_chunksize
+        self.low_memory = low_memory
+        self.memory_budget_mb = memory_budget_mb
+        self.retention_days = retention_days
+        self.dedupe = dedupe
+        self.output_dir = output_dir
+        self.output_formats = tuple(output_formats)
+        self.in_memory = in_memory
+        self.instrument = instrument
+
+    def replace(self, **changes) -> "RunOptions":
+        """A copy with some options changed."""
+        return RunOptions(**{**vars(self), **changes})
+
+
+def process_file(
+    input_file_path: Union[str, List[str]],
+    flagged_log_path: Optional[str] = None,
+    apply_blocklist: bool = True,
+    cutoff_date: Optional[datetime] = None,
+    options: Optional[RunOptions] = None,
+    *,
+    blocklist: Optional[BlocklistStore] = None,
+    prepared: Optional[Dict] = None,
+    stage_hook: Optional[Callable[[str], ContextManager]] = None,
+    progress: Optional[Callable[[str, int], None]] = None,
+    **option_changes
+):
+    """
+    Processes input file, applies cleaning and blocklist, and generates two formatted outputs:
+      - Revolt TD Reminder {date}.xlsx  (from sheet Upcoming_TR_Today_to_Today+3)
+      - Revolt TD Feedback {date}.xlsx  (from sheet TR_Completed_Y-5_to_Y, using trcompleteddate -> trscheduleactual)
+
+    options picks the mode (see RunOptions); its fields can also be passed as
+    keywords, e.g. process_file(path, workers=4). input_file_path may be a list
+    of files, parsed concurrently and merged by sheet (see merge_file_sheets).
+    blocklist, if given, is used and added to instead of loading
+    seen_feedback_mobiles.csv; prepared is prepare_input()'s result for the
+    file. progress is called with (stage, rows) as each stage starts (raise
+    from it to cancel); stage_hook wraps each stage (see profile_stages).
+
+    Returns summary counts, output paths and row counts (result["rows"]).
+    """
+    options = options.replace(**option_changes) if options is not None else RunOptions(**option_changes)
+    workers, stream_chunksize, low_memory = options.workers, options.stream_chunksize, options.low_memory
+    memory_budget_mb, dedupe, in_memory = options.memory_budget_mb, options.dedupe, options.in_memory
+    output_dir, output_formats, instrument = options.output_dir, options.output_formats, options.instrument
+    multi_file = not isinstance(input_file_path, str)
+    paths = list(input_file_path) if multi_file else [input_file_path]
+    if not paths:
+        raise ValueError("No input files given")
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Input file not found: {path}")
+    if multi_file and (stream_chunksize or low_memory or memory_budget_mb is not None or prepared is not None):
+        raise ValueError("Several input files can't be streamed, prepared or read in low-memory mode")
+    if dedupe is not None and dedupe not in DEDUPE_RULES:
+        raise ValueError(f"Unknown dedupe rule: {dedupe} (expected one of {', '.join(DEDUPE_RULES)})")
+    # Check formats up front, before the blocklist gets updated
+    for fmt in output_formats:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {fmt}")
+    if "parquet" in output_formats and not parquet_available():
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow)")
+
+    memory = rss = None
+    if low_memory or memory_budget_mb is not None:
+        low_memory, workers = True, None
+        memory = {"budget_mb": memory_budget_mb, "estimated_mb": round(float(estimate_memory_mb(input_file_path)), 1),
+                  "fallback": None}
+        if (memory_budget_mb is not None and memory["estimated_mb"] > memory_budget_mb
+                and input_file_path.lower().endswith('.csv') and not stream_chunksize):
+            stream_chunksize = budget_chunksize(input_file_path, memory_budget_mb)
+            memory["fallback"] = f"stream:{stream_chunksize}"
+        rss = PeakRss(0.05).start()
+
+    def add_memory_report(result: Dict) -> Dict:
+        if rss is not None:
+            rss.stop()
+            memory.update(peak_rss_mb=round(rss.peak_mb, 1), start_rss_mb=round(rss.start_mb, 1))
+            result["memory"] = memory
+        return result
+
+    if stream_chunksize and input_file_path.lower().endswith('.csv'):
+        today_str = datetime.today().strftime("%d %b").lstrip("0")
+        return add_memory_report(process_csv_stream(
+            input_file_path,
+            os.path.join(output_dir or "", f"Revolt Cleaned {today_str}.csv"),
+            flagged_log_path=flagged_log_path or "flagged_names.txt",
+            apply_blocklist=apply_blocklist, cutoff_date=cutoff_date, vectorized=options.vectorized,
+            chunksize=stream_chunksize, instrument=instrument, stage_hook=stage_hook, progress=progress,
+            blocklist=blocklist, retention_days=options.retention_days
+        ))
+
+    log = FlaggedLog()
+    timer = (StageTimer(track_memory=instrument, hook=stage_hook, progress=progress)
+             if instrument or stage_hook or progress else None)
+
+    if prepared is not None:
+        sheet_rows = {sheet_name: dict(counts) for sheet_name, counts in prepared["rows"].items()}
+        if timer:
+            timer.stages.update({name: dict(entry) for name, entry in prepared["stages"].items()})
+    elif low_memory:
+        # Sheets are read as the cleaning loop reaches them; row counts fill in as they go
+        all_sheets = LazySheets(input_file_path, selective=options.selective_read, engine=options.excel_engine,
+                                timer=timer)
+        sheet_rows = all_sheets.rows
+    else:
+        # Read input
+        with timed(timer, "read"):
+            if multi_file:
+                all_sheets, merged_rows, cross_file_duplicates = read_inputs(
+                    paths, selective=options.selective_read, engine=options.excel_engine,
+                    input_cache=options.input_cache, workers=workers)
+            else:
+                all_sheets = read_input(input_file_path, selective=options.selective_read, engine=options.excel_engine,
+                                        input_cache=options.input_cache)
+        sheet_rows = {sheet_name: {"input": len(df), "output": len(df)} for sheet_name, df in all_sheets.items()}
+        if multi_file:
+            for sheet_name, rows in merged_rows.items():
+                sheet_rows[sheet_name]["input"] = rows
+        if timer:
+            timer.add_rows("read", sum(counts["input"] for counts in sheet_rows.values()))
+
+    cleaned_sheets = {}
+    new_numbers = 0
+    expired_numbers = None
+    blocklist_file = BLOCKLIST_FILE
+    outputs = {"reminder": None, "feedback": None}
+
+    # Name/mobile cleanup and date formatting (optionally on a process pool, or incremental)
+    clean_log = FlaggedLog() if dedupe else log
+    if prepared is not None:
+        cleaned_iter = iter_prepared_sheets(prepared, clean_log)
+    elif options.incremental:
+        row_store = RowStore.load(options.row_store_path)
+        incremental_counts = {"reused": 0, "cleaned": 0}
+        cleaned_iter = iter_incremental_sheets(all_sheets, clean_log, row_store, incremental_counts, timer=timer)
+    else:
+        cleaned_iter = iter_cleaned_sheets(all_sheets, clean_log, options.vectorized, workers, options.partition_rows,
+                                           timer=timer)
+    if dedupe:
+        cleaned_iter = iter_deduplicated_sheets(cleaned_iter, clean_log, log, dedupe, timer=timer)
+    for sheet_name, df, mobile_col in cleaned_iter:
+        # ====================================================
+        # Blocklist filtering (applies to both sheets equally)
+        # ====================================================
+        if apply_blocklist and mobile_col:
+            if blocklist is None:
+                with timed(timer, "blocklist_load"):
+                    blocklist = BlocklistStore.from_csv(blocklist_file)
+            if options.retention_days is not None and expired_numbers is None:
+                expired_numbers = blocklist.expire(options.retention_days)
+
+            with timed(timer, "blocklist_filter", len(df)):
+                df, flagged, new_mobiles = filter_blocklisted(df, mobile_col, blocklist, cutoff_date, log)
+
+                new_numbers = len(new_mobiles)
+
+                # Append only new numbers to blocklist file, once the run can no longer be cancelled
+                blocklist.add(new_mobiles, persist=False)
+
+        sheet_rows[sheet_name]["output"] = len(df)
+        # Low-memory mode lets go of sheets that are never written
+        if not low_memory or sheet_name.strip() in TARGET_SHEETS:
+            cleaned_sheets[sheet_name] = df
+        del df
+
+    # ====================================================
+    # Create the two required outputs using Calls structure
+    # ====================================================
+    today_str = datetime.today().strftime("%d %b").lstrip("0")
+    written_rows = 0
+    output_bytes = {}
+    # Disk is only touched in memory mode when a path is given explicitly
+    if not in_memory:
+        output_dir = output_dir or ""
+        flagged_log_path = flagged_log_path or "flagged_names.txt"
+
+    def save_output(key: str, file_name: str, aligned: pd.DataFrame, fmt: str) -> None:
+        write = write_calls_workbook if fmt == "xlsx" else lambda frame, target: write_columnar(frame, target, fmt)
+        with timed(timer, f"write_{fmt}", len(aligned)):
+            if in_memory:
+                buffer = io.BytesIO()
+                write(aligned, buffer)
+                output_bytes[key] = buffer.getvalue()
+                if output_dir is not None:
+                    with open(os.path.join(output_dir, file_name), "wb") as f:
+                        f.write(output_bytes[key])
+            else:
+                write(aligned, os.path.join(output_dir, file_name))
+        if output_dir is not None:
+            outputs[key] = os.path.abspath(os.path.join(output_dir, file_name))
+
+    def save_workbook(key: str, file_name: str, aligned: pd.DataFrame) -> None:
+        nonlocal written_rows
+        stem = os.path.splitext(file_name)[0]
+        for fmt in output_formats:
+            save_output(key if fmt == "xlsx" else f"{key}_{fmt}", f"{stem}.{fmt}", aligned, fmt)
+        written_rows += len(aligned)
+
+    for sheet_name, df in cleaned_sheets.items():
+        sname = sheet_name.strip()
+
+        # For Feedback sheet, override trscheduleactual with trcompleteddate if present
+        if sname == FEEDBACK_SHEET:
+            if 'trcompleteddate' in df.columns:
+                df['trscheduleactual'] = df['trcompleteddate']
+            # else keep whatever trscheduleactual is (or blank)
+
+        # Align columns
+        with timed(timer, "align", len(df)):
+            # Only the columns the template keeps are copied, not the whole sheet
+            aligned = align_to_template(df[template_source_columns(df.columns)], TEMPLATE_COLS)
+
+        # Save only if it's one of the two target sheets
+        if sname == REMINDER_SHEET:
+            save_workbook("reminder", f"Revolt TD Reminder {today_str}.xlsx", aligned)
+
+        elif sname == FEEDBACK_SHEET:
+            save_workbook("feedback", f"Revolt TD Feedback {today_str}.xlsx", aligned)
+
+    # Save flagged log
+    with timed(timer, "write_log", len(log)):
+        if in_memory:
+            buffer = io.StringIO()
+            log.write(buffer)
+            output_bytes["flagged_log"] = buffer.getvalue().encode("utf-8")
+            if flagged_log_path is not None:
+                with open(flagged_log_path, "wb") as f:
+                    f.write(output_bytes["flagged_log"])
+        else:
+            with open(flagged_log_path, "w", encoding="utf-8", newline="") as f:
+                log.write(f)
+
+    # Past the last progress() call: a cancelled run never leaves its numbers (or expiry) in the blocklist
+    if blocklist is not None:
+        blocklist.flush()
+
+    result = {
+        "new_numbers": new_numbers,
+        **log.summary(),
+        "outputs": outputs,
+        "flagged_log": os.path.abspath(flagged_log_path) if flagged_log_path is not None else None,
+        "rows": {
+            "input": sum(counts["input"] for counts in sheet_rows.values()),
+            "output": written_rows,
+            "sheets": sheet_rows,
+        },
+    }
+    if expired_numbers is not None:
+        result["expired_numbers"] = expired_numbers
+    if dedupe:
+        result["duplicate_leads"] = log.count("duplicate_lead")
+    if multi_file:
+        result["inputs"] = {"files": [os.path.abspath(path) for path in paths],
+                            "cross_file_duplicates": cross_file_duplicates}
+    if options.incremental:
+        row_store.save()
+        result["incremental"] = incremental_counts
+    if in_memory:
+        result["output_bytes"] = output_bytes
+    if instrument:
+        result["stages"] = timer.report()
+    return add_memory_report(result)
+
+
+# ====================================================
+# Streaming CSV Processing (bounded memory)
+# ====================================================
+class DateColumnSniffer:
+    """
+    find_date_columns over a stream of chunks: each column is decided from its
+    first DATE_SAMPLE_SIZE non-null values, wherever in the file they fall.
+    """
+
+    def __init__(self):
+        self.sampled: Dict = {}
+        self.is_date: Dict = {}
+
+    def update(self, df: pd.DataFrame, columns: List) -> None:
+        for col in columns:
+            if col in self.is_date:
+                continue
+            if isinstance(col, str) and "date" in col.lower():
+                self.is_date[col] = True
+                continue
+            if col in NON_DATE_FIELDS:
+                self.is_date[col] = False
+                continue
+            need = DATE_SAMPLE_SIZE - self.sampled.get(col, 0)
+            sample = df[col].dropna().astype(str).head(need)
+            self.sampled[col] = self.sampled.get(col, 0) + len(sample)
+            if len(sample) and pd.notna(label_date_strings(pd.unique(sample.to_numpy(dtype=object)))).any():
+                self.is_date[col] = True
+            elif self.sampled[col] >= DATE_SAMPLE_SIZE:
+                self.is_date[col] = False
+
+    def settled(self, columns: List) -> bool:
+        return all(col in self.is_date for col in columns)
+
+    def date_columns(self, columns: List) -> List:
+        return [col for col in columns if self.is_date.get(col)]
+
+
+def csv_column_dtypes(input_file_path: str, chunksize: int = 100_000) -> Dict:
+    """
+    The dtype pd.read_csv would give each column when reading the whole file,
+    worked out chunk by chunk: a column stays int/float/bool only if every
+    chunk agrees (int and float widen to float, as blanks would), else text.
+    """
+    dtypes: Dict = {}
+    for chunk in pd.read_csv(input_file_path, chunksize=chunksize):
+        for col, dtype in chunk.dtypes.items():
+            dtypes.setdefault(col, set()).add(dtype.kind)
+    merged = {}
+    for col, kinds in dtypes.items():
+        if kinds == {"i"}:
+            merged[col] = "int64"
+        elif kinds <= {"i", "f"}:
+            merged[col] = "float64"
+        elif kinds == {"b"}:
+            merged[col] = "bool"
+        else:
+            merged[col] = str
+    return merged
+
+
+def process_csv_stream(
+    input_file_path: str,
+    output_path: str,
+    flagged_log_path: str = "flagged_names.txt",
+    apply_blocklist: bool = True,
+    cutoff_date: Optional[datetime] = None,
+    vectorized: bool = True,
+    chunksize: Optional[int] = 100_000,
+    instrument: bool = False,
+    stage_hook: Optional[Callable[[str], ContextManager]] = None,
+    progress: Optional[Callable[[str, int], None]] = None,
+    blocklist: Optional[BlocklistStore] = None,
+    retention_days: Optional[int] = None
+):
+    """
+    Clean a CSV chunk by chunk: names and mobiles, dates, blocklist filtering,
+    then append the chunk's template-aligned rows to `output_path`.
+
+    Column types are settled over the whole file first (csv_column_dtypes), so
+    each chunk holds the same values a whole-file read would and the output and
+    flagged log are identical for any chunksize (None = one chunk):
+      - date columns are decided from the first non-null values of the file;
+        chunks are held back only until that decision is made
+      - blocklist membership is checked against the blocklist as it was before
+        the file, as a single-frame run does
+      - log entries are spooled per section (mobile, name, blocklist) to temp
+        files and stitched together in the single-frame order at the end
+
+    instrument / stage_hook / progress / blocklist / retention_days work as in process_file; per-chunk stages add up
+    (write_csv takes the place of write_xlsx).
+
+    Returns the same summary dict as process_file.
+    """
+    if not os.path.exists(input_file_path):
+        raise FileNotFoundError(f"Input file not found: {input_file_path}")
+
+    timer = (StageTimer(track_memory=instrument, hook=stage_hook, progress=progress)
+             if instrument or stage_hook or progress else None)
+
+    with timed(timer, "read"):
+        if chunksize is None:
+            chunks = iter([pd.read_csv(input_file_path)])
+        else:
+            dtypes = csv_column_dtypes(input_file_path, chunksize)
+            chunks = pd.read_csv(input_file_path, dtype=dtypes, chunksize=chunksize)
+
+    if not apply_blocklist:
+        blocklist = None
+    elif blocklist is None:
+        with timed(timer, "blocklist_load"):
+            blocklist = BlocklistStore.from_csv(BLOCKLIST_FILE)
+    # An empty store is falsy (len 0), so check for None explicitly
+    expired_numbers = blocklist.expire(retention_days) if blocklist is not None and retention_days is not None else None
+    existing = blocklist.snapshot() if blocklist is not None else None
+    added_this_run = BlocklistStore(None)
+    added_other = set()
+
+    totals = FlaggedLog()
+    new_numbers = 0
+    input_rows = output_rows = 0
+    sniffer = DateColumnSniffer()
+    pending: List[pd.DataFrame] = []
+    wrote_output = False
+
+    def flush(final: bool) -> None:
+        nonlocal wrote_output, output_rows
+        if not pending:
+            return
+        sources = template_source_columns(pending[0].columns)
+        if not final and not sniffer.settled(sources):
+            return
+        date_cols = sniffer.date_columns(sources)
+        for chunk in pending:
+            with timed(timer, "dates", len(chunk)):
+                chunk = format_sheet_dates(chunk, date_cols, vectorized)
+            with timed(timer, "align", len(chunk)):
+                aligned = align_to_template(chunk, TEMPLATE_COLS)
+            with timed(timer, "write_csv", len(aligned)):
+                aligned.to_csv(output_path, mode="a" if wrote_output else "w", header=not wrote_output, index=False)
+            wrote_output = True
+            output_rows += len(aligned)
+        pending.clear()
+
+    sections = [tempfile.TemporaryFile("w+", encoding="utf-8", newline="") for _ in range(3)]
+    try:
+        while True:
+            with timed(timer, "read"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            input_rows += len(chunk)
+            if timer:
+                timer.add_rows("read", len(chunk))
+            chunk_logs = [FlaggedLog(), FlaggedLog(), FlaggedLog()]
+            mobile_log, name_log, block_log = chunk_logs
+
+            mobile_col = clean_sheet_columns(chunk, mobile_log, vectorized, name_log=name_log, timer=timer)
+            with timed(timer, "dates"):
+                sniffer.update(chunk, template_source_columns(chunk.columns))
+
+            if blocklist is not None and mobile_col:
+                with timed(timer, "blocklist_filter", len(chunk)):
+                    chunk, _, new_mobiles = filter_blocklisted(chunk, mobile_col, existing, cutoff_date, block_log)
+                    # Numbers repeated across chunks are only new the first time
+                    keyed, _ = _mobile_keys(new_mobiles)
+                    fresh = ~added_this_run.contains(new_mobiles)
+                    fresh[~keyed] = [m not in added_other for m in new_mobiles[~keyed]]
+                    added_other.update(new_mobiles[~keyed & fresh])
+                    new_mobiles = new_mobiles[fresh]
+                    added_this_run.add(new_mobiles)
+                    blocklist.add(new_mobiles, persist=False)
+                    new_numbers += len(new_mobiles)
+
+            with timed(timer, "write_log"):
+                for section, chunk_log in zip(sections, chunk_logs):
+                    chunk_log.write(section, header=False)
+                    totals.reason_counts += chunk_log.reason_counts
+                    if timer:
+                        timer.add_rows("write_log", len(chunk_log))
+
+            pending.append(chunk)
+            flush(final=False)
+        flush(final=True)
+
+        if not wrote_output:
+            pd.DataFrame(columns=TEMPLATE_COLS).to_csv(output_path, index=False)
+
+        with timed(timer, "write_log"):
+            with open(flagged_log_path, "w", encoding="utf-8", newline="") as f:
+                f.write(LOG_HEADER)
+                for section in sections:
+                    section.seek(0)
+                    shutil.copyfileobj(section, f)
+    finally:
+        for section in sections:
+            section.close()
+
+    # Past the last progress() call: a cancelled run never leaves its numbers (or expiry) in the blocklist
+    if blocklist is not None:
+        blocklist.flush()
+
+    result = {
+        "new_numbers": new_numbers,
+        **totals.summary(),
+        "outputs": {"reminder": None, "feedback": None, "cleaned_csv": os.path.abspath(output_path)},
+        "flagged_log": os.path.abspath(flagged_log_path),
+        "rows": {"input": input_rows, "output": output_rows,
+                 "sheets": {"Sheet1": {"input": input_rows, "output": output_rows}}},
     }
+    if expired_numbers is not None:
+        result["expired_numbers"] = expired_numbers
+    if instrument:
+        result["stages"] = timer.report()
+    return result
@@ -0,0 +1,200 @@
+"""
+Clean many daily lead files in one process, oldest first.
+
+    python batch.py exports/ --output-dir cleaned/
+    python batch.py "exports/Calling Data *.xlsx" --output-dir cleaned/ --workers 4
+    python batch.py exports/ --output-dir cleaned/ --cutoff 2024-10-01 --summary batch.json
+
+Inputs are directories (every .xlsx/.xls/.csv in them) and/or glob patterns.
+Files are ordered by the date in their name (2024-10-01, 20241001, 01-10-2024
+or 1 Oct 2024), falling back to their modification time. The blocklist and
+cleaning rules are loaded once; each file sees the blocklist additions of
+the files before it, exactly as if they had been run one after another.
+With --workers N, files are read and cleaned ahead on N processes while the
+blocklist filtering and output writing stay in date order here.
+
+Each file's outputs go to <output-dir>/<file name without extension>/.
+One JSON line per file (counts, rows, outputs, stage timings) is printed to
+stdout, followed by a totals line; exit status is 1 if any file failed.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import Revoltv11 as rv
+
+INPUT_EXTENSIONS = (".xlsx", ".xls", ".csv")
+FILE_DATE_PATTERNS = [
+    (re.compile(r"(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)"), "{0}-{1}-{2}", "%Y-%m-%d"),
+    (re.compile(r"(?<!\d)(\d{1,2})[-_.](\d{1,2})[-_.](\d{4})(?!\d)"), "{0}-{1}-{2}", "%d-%m-%Y"),
+    (re.compile(r"(?<!\d)(\d{1,2})[ _-]?([A-Za-z]{3})[A-Za-z]*[ _-]?(\d{4})(?!\d)"), "{0} {1} {2}", "%d %b %Y"),
+]
+
+
+# ====================================================
+# Input Discovery & Ordering
+# ====================================================
+def find_inputs(patterns: List[str]) -> List[str]:
+    """Files named by directories and/or glob patterns (deduplicated, temp ~$ files skipped)."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            paths = glob.glob(pattern)
+        found.extend(
+            os.path.abspath(path) for path in paths
+            if os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS)
+            and not os.path.basename(path).startswith("~$")
+        )
+    return list(dict.fromkeys(found))
+
+
+def file_date(path: str) -> datetime:
+    """Date in the file name, else the file's modification time."""
+    name = os.path.basename(path)
+    for pattern, template, fmt in FILE_DATE_PATTERNS:
+        for match in pattern.finditer(name):
+            try:
+                return datetime.strptime(template.format(*match.groups()), fmt)
+            except ValueError:
+                continue
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def order_inputs(paths: List[str]) -> List[str]:
+    return sorted(paths, key=lambda path: (file_date(path), os.path.basename(path)))
+
+
+# ====================================================
+# Batch Run
+# ====================================================
+def run_batch(paths: List[str], output_dir: str, blocklist_path: Optional[str] = rv.BLOCKLIST_FILE,
+              cutoff_date: Optional[datetime] = None, workers: int = 1, selective_read: bool = False,
+              output_formats=("xlsx",), input_cache: Optional[str] = None, retention_days: Optional[int] = None,
+              dedupe: Optional[str] = None, emit=print) -> List[Dict]:
+    """
+    Process `paths` in the given order, sharing one loaded blocklist
+    (blocklist_path=None skips blocklist filtering). retention_days=N expires
+    blocklist entries older than N days once, before the first file; dedupe
+    is passed on to process_file (repeated leads within each file). `emit`
+    gets each file's summary line as soon as the file is done. Returns the
+    summaries.
+    """
+    blocklist = rv.BlocklistStore.from_csv(blocklist_path) if blocklist_path else None
+    if blocklist is not None and retention_days is not None:
+        emit(json.dumps({"expired_numbers": blocklist.expire(retention_days)}))
+    options = rv.RunOptions(selective_read=selective_read, instrument=True, input_cache=input_cache,
+                            output_formats=output_formats, dedupe=dedupe)
+    pool = (ProcessPoolExecutor(max_workers=workers, initializer=rv.use_name_blacklist, initargs=(rv.NAME_MATCHER,))
+            if workers > 1 else None)
+    # Keep at most 2 files per worker read ahead, so memory stays bounded
+    window = 2 * workers
+    pending = {}
+    summaries = []
+    try:
+        for position, path in enumerate(paths):
+            if pool is not None:
+                for ahead in paths[position:position + window]:
+                    if ahead not in pending:
+                        pending[ahead] = pool.submit(rv.prepare_input, ahead, selective_read=selective_read,
+                                                     instrument=True, input_cache=input_cache)
+            file_out = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+            summary = {"file": path, "date": file_date(path).strftime("%Y-%m-%d")}
+            start = time.perf_counter()
+            # A failed file must not leave its additions behind for the next file to persist
+            state = blocklist.checkpoint() if blocklist is not None else None
+            try:
+                prepared = pending.pop(path).result() if pool is not None else None
+                os.makedirs(file_out, exist_ok=True)
+                result = rv.process_file(
+                    path,
+                    flagged_log_path=os.path.join(file_out, "flagged_names.txt"),
+                    apply_blocklist=blocklist is not None,
+                    cutoff_date=cutoff_date,
+                    options=options.replace(output_dir=file_out),
+                    blocklist=blocklist,
+                    prepared=prepared,
+                )
+                summary.update(status="ok", **result)
+            except Exception as e:
+                if blocklist is not None:
+                    blocklist.rollback(state)
+                summary.update(status="error", error=f"{type(e).__name__}: {e}")
+            summary["seconds"] = round(time.perf_counter() - start, 4)
+            summaries.append(summary)
+            emit(json.dumps(summary, default=str))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return summaries
+
+
+def batch_totals(summaries: List[Dict]) -> Dict:
+    ok = [s for s in summaries if s["status"] == "ok"]
+    return {
+        "files": len(summaries),
+        "ok": len(ok),
+        "failed": len(summaries) - len(ok),
+        "new_numbers": sum(s["new_numbers"] for s in ok),
+        "name_fixes": sum(s["name_fixes"] for s in ok),
+        "mobile_fixes": sum(s["mobile_fixes"] for s in ok),
+        "invalid_cases": sum(s["invalid_cases"] for s in ok),
+        "rows_input": sum(s["rows"]["input"] for s in ok),
+        "rows_output": sum(s["rows"]["output"] for s in ok),
+        "seconds": round(sum(s["seconds"] for s in summaries), 4),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="input directories and/or glob patterns")
+    parser.add_argument("--output-dir", required=True, help="where each file's outputs are written")
+    parser.add_argument("--blocklist", default=rv.BLOCKLIST_FILE, help="blocklist CSV to filter against and extend")
+    parser.add_argument("--no-blocklist", action="store_true", help="skip blocklist filtering")
+    parser.add_argument("--cutoff", type=lambda s: datetime.strptime(s, "%Y-%m-%d"),
+                        help="only block numbers added on/before this date (YYYY-MM-DD)")
+    parser.add_argument("--retention-days", type=int,
+                        help="expire blocklist numbers added more than this many days ago")
+    parser.add_argument("--dedupe", choices=rv.DEDUPE_RULES,
+                        help="drop repeated leads across the Reminder/Feedback sheets, keeping this copy")
+    parser.add_argument("--name-blacklist", help="junk-name term file (default: name_blacklist.txt)")
+    parser.add_argument("--workers", type=int, default=1, help="processes reading/cleaning files ahead")
+    parser.add_argument("--selective-read", action="store_true", help="read only the two target sheets")
+    parser.add_argument("--formats", default="xlsx",
+                        help=f"comma-separated output formats ({', '.join(rv.OUTPUT_FORMATS)})")
+    parser.add_argument("--input-cache", help="directory caching parsed inputs by content hash")
+    parser.add_argument("--summary", help="also write the summaries and totals as JSON here")
+    args = parser.parse_args(argv)
+
+    paths = order_inputs(find_inputs(args.inputs))
+    if not paths:
+        parser.error("no input files found")
+    if args.name_blacklist:
+        rv.use_name_blacklist(args.name_blacklist)
+
+    summaries = run_batch(
+        paths, args.output_dir,
+        blocklist_path=None if args.no_blocklist else args.blocklist,
+        cutoff_date=args.cutoff, workers=args.workers, selective_read=args.selective_read,
+        output_formats=tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip()),
+        input_cache=args.input_cache, retention_days=args.retention_days, dedupe=args.dedupe,
+    )
+    totals = batch_totals(summaries)
+    print(json.dumps({"totals": totals}))
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump({"files": summaries, "totals": totals}, f, indent=2, default=str)
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Benchmark the cleaning pipeline on synthetic lead data.
+
+    python benchmark.py                          # 10k, 100k, 1M and 5M rows
+    python benchmark.py --sizes 10k,100k         # a subset
+    python benchmark.py --save-baseline          # record benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --tolerance 0.25
+
+Inputs are generated once per size (deterministic, seeded) and cached in
+--data-dir. Each run works in a fresh temp directory with its own synthetic
+blocklist, so the real seen_feedback_mobiles.csv is never touched. Stage wall
+time, rows and peak memory growth come from process_file(instrument=True),
+plus the run's total time and peak RSS; with a baseline, any stage that got
+slower (or bigger) than the tolerance fails the run (exit 1).
+Everything runs offline.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import Revoltv11 as rv
+
+# ====================================================
+# Synthetic Lead Data
+# ====================================================
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+EXCEL_MAX_ROWS = 1_048_575  # data rows per sheet (one row is the header)
+BLOCKLIST_SIZE = 50_000
+
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sunita", "Gurpreet", "Rajesh", "Neha", "Vikram", "Anjali", "Suresh",
+               "Pooja", "Arjun", "Kavita", "Manoj", "Deepak", "Sanjay", "Meena", "Ravi", "Jaspal", "Farhan",
+               "RAHUL", "PRIYA", "AMIT", "rajesh", "neha", "vikram"]
+LAST_NAMES = ["Sharma", "Singh", "Kumar", "Nayak", "Dhaliwal", "Patel", "Reddy", "Gupta", "Verma", "Khan",
+              "Yadav", "Das", "Iyer", "Joshi", "Mehta", "SHARMA", "SINGH", "kumar"]
+NAME_SEPARATORS = [" ", " ", " ", "", "  ", "_", "-", ". "]
+NAME_SUFFIXES = ["", "", "", "", "", " RV400", " RV1+", " rv blazex", "-RV 400", " (RV1)", "9082", " 413", "!!"]
+JUNK_NAMES = ["", "na", "NA", "k", "12345", "joker", "spam callers", "bsnl fiber", "aaa", "bcd", "-", None]
+MOBILE_PREFIXES = ["", "", "", "+91 ", "+91-", "+91", "0", "91", "0091 "]
+HUBS = ["Delhi", "Pune", "Hyderabad", "Bengaluru", "Chennai", "Kolkata", "Ahmedabad", "Jaipur"]
+MODELS = ["RV400", "RV1", "RV1+", "RV BlazeX", "RV400BRZ"]
+DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%d-%b-%Y", "%d/%m/%Y %H:%M"]
+DATE_START = pd.Timestamp("2025-09-01")
+DATE_SPAN_HOURS = 60 * 24
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def size_label(rows: int) -> str:
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}M"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+
+def synthetic_blocklist(seed: int = 0) -> np.ndarray:
+    """Distinct 10-digit numbers (as strings) used both as the blocklist and as repeat leads."""
+    rng = np.random.default_rng(seed + 1)
+    return np.unique(rng.integers(6_000_000_000, 10_000_000_000, BLOCKLIST_SIZE)).astype(str)
+
+
+def _pick(rng: np.random.Generator, values: List, n: int) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _dates(rng: np.random.Generator, n: int, blank_share: float) -> np.ndarray:
+    # Every (hour, format) string is rendered once, then rows index into that pool
+    hours = DATE_START + pd.to_timedelta(np.arange(DATE_SPAN_HOURS), unit="h")
+    pool = np.array([stamp.strftime(fmt) for stamp in hours for fmt in DATE_FORMATS], dtype=object)
+    values = pool[rng.integers(0, len(pool), n)]
+    values[rng.random(n) < blank_share] = None
+    return values
+
+
+def generate_leads(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Rows shaped like the real export: messy names (bike-model suffixes, digits,
+    camel case, junk), prefixed/short/blocklisted mobiles and mixed date formats.
+    """
+    rng = np.random.default_rng(seed)
+
+    names = (_pick(rng, FIRST_NAMES, rows) + _pick(rng, NAME_SEPARATORS, rows)
+             + _pick(rng, LAST_NAMES, rows) + _pick(rng, NAME_SUFFIXES, rows))
+    junk = rng.random(rows) < 0.05
+    names[junk] = _pick(rng, JUNK_NAMES, int(junk.sum()))
+
+    mobiles = _pick(rng, MOBILE_PREFIXES, rows) + rng.integers(6_000_000_000, 10_000_000_000, rows).astype(str)
+    repeat = rng.random(rows) < 0.03
+    mobiles[repeat] = _pick(rng, list(synthetic_blocklist(seed)), int(repeat.sum()))
+    short = rng.random(rows) < 0.01
+    mobiles[short] = _pick(rng, ["12345", "98765-4", "", None], int(short.sum()))
+
+    return pd.DataFrame({
+        "hub": _pick(rng, HUBS, rows),
+        "model": _pick(rng, MODELS, rows),
+        # Header spellings the cleaners pick up (and align to customer_name/mobile_number)
+        "Customer Name": names,
+        "Mobile Number": mobiles,
+        "opportunityid": np.char.add("OPP", rng.integers(1, 10 * rows, rows).astype(str)).astype(object),
+        "trscheduleactual": _dates(rng, rows, 0.05),
+        "trcompleteddate": _dates(rng, rows, 0.2),
+    })
+
+
+def write_input(rows: int, data_dir: str, seed: int = 0, fmt: Optional[str] = None) -> str:
+    """
+    Generate (or reuse) the input file for `rows`. Rows are split between the
+    reminder and feedback sheets of a workbook; sizes that do not fit in two
+    Excel sheets (or fmt="csv") are written as a single CSV instead.
+    """
+    if fmt is None:
+        fmt = "xlsx" if rows <= 2 * EXCEL_MAX_ROWS else "csv"
+    path = os.path.join(data_dir, f"leads_{size_label(rows)}_seed{seed}.{fmt}")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(data_dir, exist_ok=True)
+    df = generate_leads(rows, seed)
+    partial = os.path.join(data_dir, "partial_" + os.path.basename(path))
+    if fmt == "csv":
+        df.to_csv(partial, index=False)
+    else:
+        half = rows // 2
+        # No constant_memory here: pandas writes cells column by column, which that mode drops
+        with pd.ExcelWriter(partial, engine="xlsxwriter") as writer:
+            df.iloc[:half].to_excel(writer, sheet_name=rv.REMINDER_SHEET, index=False)
+            df.iloc[half:].to_excel(writer, sheet_name=rv.FEEDBACK_SHEET, index=False)
+    os.replace(partial, path)
+    return path
+
+
+# ====================================================
+# Benchmark Runs
+# ====================================================
+STREAM_CHUNKSIZE = 100_000
+
+
+def benchmark_size(rows: int, data_dir: str, seed: int = 0, fmt: Optional[str] = None,
+                   vectorized: bool = True, low_memory: bool = False) -> Dict:
+    """
+    Run process_file (instrument=True) on the input for `rows` inside a temp
+    directory. CSV inputs go through the streaming path. Peak RSS is sampled
+    around process_file only, so generating the input doesn't count.
+    """
+    gen_start = time.perf_counter()
+    input_path = os.path.abspath(write_input(rows, data_dir, seed, fmt))
+    generate_seconds = time.perf_counter() - gen_start
+
+    work_dir = tempfile.mkdtemp(prefix="revolt_bench_")
+    cwd = os.getcwd()
+    try:
+        os.chdir(work_dir)
+        pd.DataFrame({"Mobile": synthetic_blocklist(seed), "DateAdded": "2025-09-30"}).to_csv(
+            rv.BLOCKLIST_FILE, index=False, header=False)
+        stream = STREAM_CHUNKSIZE if input_path.endswith(".csv") else None
+        options = rv.RunOptions(vectorized=vectorized, stream_chunksize=stream, low_memory=low_memory, instrument=True)
+        start = time.perf_counter()
+        with rv.PeakRss() as rss:
+            result = rv.process_file(input_path, options=options)
+        total_seconds = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "rows": rows,
+        "input": os.path.basename(input_path),
+        "generate_seconds": round(generate_seconds, 2),
+        "total_seconds": round(total_seconds, 4),
+        "peak_rss_mb": round(rss.peak_mb, 1),
+        "stages": result["stages"],
+    }
+
+
+# ====================================================
+# Baseline Comparison
+# ====================================================
+def compare_to_baseline(results: List[Dict], baseline: Dict, tolerance: float,
+                        min_seconds: float = 0.05, min_mb: float = 20.0) -> List[str]:
+    """
+    Stages (and the whole run) slower, or growing memory more, than
+    baseline * (1 + tolerance).
+    Differences under min_seconds / min_mb are treated as noise.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(size_label(result["rows"]))
+        if not base or base["input"] != result["input"]:
+            continue
+        checks = [(stage, now, base["stages"].get(stage)) for stage, now in result["stages"].items()]
+        checks.append(("overall", {"seconds": result["total_seconds"], "peak_rss_mb": result["peak_rss_mb"]},
+                       {"seconds": base["total_seconds"], "peak_rss_mb": base["peak_rss_mb"]}))
+        for stage, now, before in checks:
+            if not before:
+                continue
+            for key, floor, unit in (("seconds", min_seconds, "s"), ("peak_mem_delta_mb", min_mb, " MB"),
+                                     ("peak_rss_mb", min_mb, " MB")):
+                if key not in now or key not in before:
+                    continue
+                if now[key] > before[key] * (1 + tolerance) and now[key] - before[key] > floor:
+                    regressions.append(f"{size_label(result['rows'])} {stage}: {key} "
+                                       f"{before[key]}{unit} -> {now[key]}{unit}")
+    return regressions
+
+
+def print_report(results: List[Dict], baseline: Optional[Dict] = None) -> None:
+    for result in results:
+        label = size_label(result["rows"])
+        base = (baseline or {}).get(label, {})
+        base = base.get("stages", {}) if base.get("input") == result["input"] else {}
+        print(f"\n{label} rows ({result['input']}): {result['total_seconds']:.2f}s, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB")
+        for stage, now in result["stages"].items():
+            line = (f"  {stage:<16} {now['seconds']:>9.3f}s {now['rows']:>10} rows "
+                    f"{now['peak_mem_delta_mb']:>8.1f} MB")
+            if stage in base and base[stage]["seconds"]:
+                line += f"   {now['seconds'] / base[stage]['seconds']:.2f}x baseline time"
+            print(line)
+
+
+def run_isolated(rows: int, args) -> Dict:
+    """Benchmark one size in a fresh interpreter so peak RSS is not inflated by earlier sizes."""
+    import subprocess
+    command = [sys.executable, os.path.abspath(__file__), "--single", str(rows), "--data-dir", args.data_dir,
+               "--seed", str(args.seed)]
+    if args.format:
+        command += ["--format", args.format]
+    if args.row_wise:
+        command.append("--row-wise")
+    if args.low_memory:
+        command.append("--low-memory")
+    done = subprocess.run(command, capture_output=True, text=True)
+    if done.returncode:
+        raise RuntimeError(f"Benchmark of {size_label(rows)} rows failed:\n{done.stderr}")
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(size_label(n) for n in DEFAULT_SIZES),
+                        help="comma-separated row counts, e.g. 10k,100k,1M")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "revolt_benchmark"),
+                        help="where generated inputs are cached")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["xlsx", "csv"], help="input format (default: xlsx when it fits)")
+    parser.add_argument("--row-wise", action="store_true", help="benchmark the row-by-row cleaners")
+    parser.add_argument("--low-memory", action="store_true", help="benchmark process_file(low_memory=True)")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--output", help="also write the results JSON here")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        result = benchmark_size(args.single, args.data_dir, args.seed, args.format, not args.row_wise,
+                                args.low_memory)
+        print(json.dumps(result))
+        return 0
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    # Inputs are generated here, before the measured runs start
+    for rows in sizes:
+        write_input(rows, args.data_dir, args.seed, args.format)
+    results = [run_isolated(rows, args) for rows in sizes]
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    summary = {size_label(r["rows"]): r for r in results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# ====================================================
+# Job States
+# ====================================================
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job (from its progress callback) once cancel() was requested."""
+
+
+# ====================================================
+# Job
+# ====================================================
+class Job:
+    """
+    One queued call and what is known about it: status, the stage and rows
+    last reported through progress(), the stages seen so far, and the result
+    (or error) once finished. Read by the UI while the worker updates it.
+    """
+
+    def __init__(self, job_id: str, label: str, key=None):
+        self.id = job_id
+        self.label = label
+        self.key = key
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.rows = 0
+        self.stages_seen: List[str] = []
+        self.result = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def progress(self, stage: str, rows: int = 0) -> None:
+        """Progress callback handed to the job; raises JobCancelled once cancel() was requested."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.stage = stage
+        self.rows = rows
+        if stage not in self.stages_seen:
+            self.stages_seen.append(stage)
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+# ====================================================
+# Job Runner
+# ====================================================
+class JobRunner:
+    """
+    Runs submitted callables on a small thread pool, in submission order.
+
+    submit(fn, ...) queues fn(*args, progress=job.progress, **kwargs) and
+    returns the Job straight away. Jobs can be cancelled while queued, or while
+    running at the next progress() call. Finished jobs (and their results) are
+    kept, newest `keep`, so they can be looked up again by id or key after a
+    page refresh. Ids are random tokens: holding a job's id is what grants
+    access to its result, so it can go in a URL without exposing other users'
+    jobs. One worker by default: process_file jobs update the shared blocklist
+    file and must not interleave.
+    """
+
+    def __init__(self, max_workers: int = 1, keep: int = 20):
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, label: str = "", key=None, **kwargs) -> Job:
+        with self._lock:
+            job = Job(secrets.token_urlsafe(16), label, key)
+            self._jobs[job.id] = job
+            self._prune()
+        job._future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs) -> None:
+        if job.cancel_requested:
+            job.status, job.finished_at = CANCELLED, time.time()
+            return
+        job.status, job.started_at = RUNNING, time.time()
+        try:
+            job.result = fn(*args, progress=job.progress, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or ask a running one to stop. False if it already finished."""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.status, job.finished_at = CANCELLED, time.time()
+        return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def find(self, key) -> Optional[Job]:
+        """Most recent job submitted with `key` that was not cancelled or failed."""
+        for job in reversed(list(self._jobs.values())):
+            if job.key == key and job.status not in (CANCELLED, FAILED):
+                return job
+        return None
+
+    def jobs(self) -> List[Job]:
+        """All known jobs, oldest first."""
+        return list(self._jobs.values())
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.keep, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, cancel_pending: bool = True) -> None:
+        if cancel_pending:
+            for job in self.jobs():
+                self.cancel(job.id)
+        self._pool.shutdown(wait=True)
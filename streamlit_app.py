@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
 import os
+import time
 from datetime import datetime, timedelta
-from Revoltv11 import process_file, load_blocklist
+from Revoltv11 import process_file, load_blocklist, RunOptions, INPUT_CACHE_DIR, RETENTION_SUFFIX
+from job_runner import JobRunner, QUEUED, RUNNING, DONE, FAILED, CANCELLED
 import subprocess
 import glob
+import hashlib
 
 # ====================================================
 # GitHub Auto-Commit for Blocklist
-# (keeps original behavior)
+# (keeps original behavior; returns a (level, message) notice
+# since it runs inside a background job, away from the page)
 # ====================================================
 def commit_blocklist_to_github():
     try:
@@ -21,25 +25,27 @@ def commit_blocklist_to_github():
         subprocess.run(["git", "config", "--global", "user.email", f"{user}@users.noreply.github.com"], check=True)
         subprocess.run(["git", "config", "--global", "user.name", user], check=True)
 
-        subprocess.run(["git", "add", "seen_feedback_mobiles.csv"], check=True)
+        # The retention watermark (written when entries expire) travels with the blocklist
+        tracked = [path for path in ("seen_feedback_mobiles.csv", "seen_feedback_mobiles.csv" + RETENTION_SUFFIX)
+                   if os.path.exists(path)]
+        subprocess.run(["git", "add", *tracked], check=True)
 
         status = subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True)
-        if "seen_feedback_mobiles.csv" not in status.stdout:
-            st.info("ℹ️ No changes in blocklist file detected, skipping GitHub commit.")
-            return
+        if not any(path in status.stdout for path in tracked):
+            return ("info", "ℹ️ No changes in blocklist file detected, skipping GitHub commit.")
 
         subprocess.run(["git", "commit", "-m", "Update blocklist [auto-commit]"], check=True)
         subprocess.run(["git", "push", remote_url, "main"], check=True)
 
-        st.success("✅ Blocklist committed to GitHub successfully.")
+        return ("success", "✅ Blocklist committed to GitHub successfully.")
     except Exception as e:
-        st.warning(f"⚠️ Could not commit blocklist: {e}")
+        return ("warning", f"⚠️ Could not commit blocklist: {e}")
 
 # ====================================================
 # Auto-cleanup old files
 # ====================================================
 def cleanup_old_files(keep_files):
-    patterns = ["uploaded_*.xlsx", "Revolt TD Reminder *.xlsx", "Revolt TD Feedback *.xlsx", "flagged_*.txt"]
+    patterns = ["Revolt TD Reminder *.xlsx", "Revolt TD Feedback *.xlsx", "flagged_*.txt"]
     for pattern in patterns:
         for f in glob.glob(pattern):
             if f not in keep_files:
@@ -75,140 +81,226 @@ st.divider()
 # File Upload + Blocklist Options
 # ====================================================
 with st.container(border=True):
-    st.markdown("### 📂 Upload Excel File")
+    st.markdown("### 📂 Upload Excel File(s)")
 
-    uploaded_file = st.file_uploader("Choose a file", type=["xlsx","xls","csv"], label_visibility="collapsed")
+    # Several regional exports are merged into one Reminder and one Feedback file
+    uploaded_files = st.file_uploader("Choose files", type=["xlsx","xls","csv"], accept_multiple_files=True,
+                                      label_visibility="collapsed")
 
     st.markdown("### ⚙️ Blocklist Options")
     use_blocklist = st.checkbox("Apply Blocklist Filtering", value=True)
     # Default cutoff date is today, per your request
     cutoff_date = None
+    retention_days = None
     if use_blocklist:
         cutoff_date = st.date_input("Blocklist Cutoff Date", value=datetime.today())
+        retention_days = st.number_input("Expire numbers older than (days, 0 = never)", min_value=0, value=0, step=30)
+        retention_days = int(retention_days) or None
+
+    st.markdown("### 🔁 Duplicate Leads")
+    # Same mobile (or opportunity_id) in both sheets or repeated in one: keep one copy
+    DEDUPE_OPTIONS = {"Keep all": None, "Keep first": "first", "Keep latest date": "latest",
+                      "Prefer completed": "completed"}
+    dedupe = DEDUPE_OPTIONS[st.selectbox("Duplicate leads", list(DEDUPE_OPTIONS), label_visibility="collapsed")]
 
 # ====================================================
-# Run Processing
+# Run Processing (background jobs, cached per upload + options)
 # ====================================================
-if uploaded_file is not None:
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    input_path = f"uploaded_{timestamp}.xlsx"
-    flagged_log = f"flagged_{timestamp}.txt"
-    blocklist_file = "seen_feedback_mobiles.csv"
+JOB_POLL_SECONDS = 0.5
+# Stages in the order process_file runs them, for the progress bar
+PROGRESS_STAGES = ["read", "clean_mobiles", "clean_names", "dates", "dedupe", "blocklist_load",
+                   "blocklist_filter", "align", "write_xlsx", "write_log"]
 
-    with open(input_path, "wb") as f:
-        f.write(uploaded_file.read())
 
-    if st.button("🚀 Run Cleaning", use_container_width=True, type="primary"):
-        st.info("⚡ Running cleaner, please wait...")
+@st.cache_resource
+def get_job_runner():
+    """One runner per server: jobs queue behind each other instead of blocking sessions."""
+    return JobRunner(max_workers=1, keep=20)
+
+
+def run_cleaning(uploads, use_blocklist, cutoff_date, retention_days=None, dedupe=None, progress=None):
+    """
+    Write the uploads ((name, bytes) pairs), run process_file once over all of
+    them in memory, and keep the output bytes for the download buttons.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    input_paths = []
+    blocklist_file = "seen_feedback_mobiles.csv"
+    notices = []
+
+    for number, (upload_name, upload_bytes) in enumerate(uploads):
+        suffix = os.path.splitext(upload_name)[1].lower() or ".xlsx"
+        input_paths.append(f"uploaded_{timestamp}_{number}{suffix}")
+        with open(input_paths[-1], "wb") as f:
+            f.write(upload_bytes)
 
-        # Run backend
+    try:
         result = process_file(
-            input_path,
-            flagged_log_path=flagged_log,
+            # Several files are parsed concurrently and merged into one run
+            input_paths[0] if len(input_paths) == 1 else input_paths,
             apply_blocklist=use_blocklist,
-            cutoff_date=cutoff_date
+            cutoff_date=cutoff_date,
+            options=RunOptions(
+                retention_days=retention_days,
+                dedupe=dedupe,
+                instrument=True,
+                in_memory=True,
+                # Re-runs of the same upload (e.g. another cutoff date) skip the Excel parse
+                input_cache=INPUT_CACHE_DIR,
+            ),
+            progress=progress,
         )
-
-        # ====================================================
-        # Process Summary (keeps original metrics)
-        # ====================================================
-        with st.container(border=True):
-            st.subheader("📊 Process Summary")
-
+    finally:
+        for input_path in input_paths:
             try:
-                # Count rows across the generated outputs (if present)
-                processed_rows = 0
-                # Original row counts
-                orig_df = pd.ExcelFile(input_path)
-                orig_rows = sum(len(orig_df.parse(s)) for s in orig_df.sheet_names)
+                os.remove(input_path)
             except Exception:
-                orig_rows = "N/A"
-
-            # We can compute cleaned rows from generated files if they exist
-            cleaned_total = 0
-            if result.get("outputs"):
-                for k, path in result["outputs"].items():
-                    if path and os.path.exists(path):
-                        try:
-                            cleaned_excel = pd.ExcelFile(path)
-                            cleaned_total += sum(len(cleaned_excel.parse(s)) for s in cleaned_excel.sheet_names)
-                        except Exception:
-                            pass
-
-            removed_rows = (orig_rows - cleaned_total) if isinstance(orig_rows, int) else "N/A"
-
-            m1, m2, m3, m4 = st.columns(4)
-            m1.metric("✅ Processed", orig_rows)
-            m2.metric("🧹 Cleaned", cleaned_total)
-            m3.metric("⛔ Removed (Blocklist)", removed_rows if use_blocklist else "N/A")
-            m4.metric("📋 New Blocklist", result["new_numbers"] if use_blocklist else "N/A")
-
-            c1, c2, c3 = st.columns(3)
-            c1.metric("✏️ Names Fixed", result["name_fixes"])
-            c2.metric("📱 Mobiles Fixed", result["mobile_fixes"])
-            c3.metric("⚠️ Invalid Cases", result["invalid_cases"])
-
-        # ====================================================
-        # Downloads (two separate files)
-        # ====================================================
-        with st.container(border=True):
-            st.subheader("⬇️ Downloads")
-            d1, d2, d3 = st.columns(3)
-
-            pretty_date = format_today_for_filename()
-
-            if result.get("outputs", {}).get("reminder"):
-                with d1:
-                    try:
-                        with open(result["outputs"]["reminder"], "rb") as f:
-                            st.download_button(
-                                "⬇️ Download TD Reminder File",
-                                f,
-                                file_name=f"Revolt TD Reminder {pretty_date}.xlsx",
-                                use_container_width=True
-                            )
-                    except Exception as e:
-                        st.error(f"Could not open reminder file: {e}")
-
-            if result.get("outputs", {}).get("feedback"):
-                with d2:
-                    try:
-                        with open(result["outputs"]["feedback"], "rb") as f:
-                            st.download_button(
-                                "⬇️ Download TD Feedback File",
-                                f,
-                                file_name=f"Revolt TD Feedback {pretty_date}.xlsx",
-                                use_container_width=True
-                            )
-                    except Exception as e:
-                        st.error(f"Could not open feedback file: {e}")
-
-            # Flagged log & blocklist download
-            with d3:
-                try:
-                    with open(result.get("flagged_log"), "rb") as f:
-                        st.download_button("⚠️ Flagged Log", f, file_name=f"flagged {pretty_date}.txt", use_container_width=True)
-                except Exception:
-                    st.info("⚠️ No flagged log available.")
-
-        # ====================================================
-        # Commit blocklist back to GitHub
-        # ====================================================
-        if use_blocklist:
-            if result["new_numbers"] > 0:
-                commit_blocklist_to_github()
+                pass
+
+    # Outputs never touch the disk, so concurrent users can't overwrite each other's files
+    files = result.pop("output_bytes", {})
+
+    # ====================================================
+    # Commit blocklist back to GitHub
+    # ====================================================
+    if use_blocklist:
+        if result["new_numbers"] > 0 or result.get("expired_numbers"):
+            notices.append(commit_blocklist_to_github())
+        else:
+            notices.append(("info", "ℹ️ No new blocklist entries to commit, skipping GitHub push."))
+
+    # ====================================================
+    # Cleanup leftovers from older runs (uploads, date-named outputs)
+    # ====================================================
+    cleanup_old_files([blocklist_file])
+
+    return {"result": result, "files": files, "notices": notices}
+
+
+runner = get_job_runner()
+
+if uploaded_files:
+    uploads = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+    upload_hashes = tuple(hashlib.sha256(upload_bytes).hexdigest() for _, upload_bytes in uploads)
+    upload_label = uploads[0][0] if len(uploads) == 1 else f"{len(uploads)} files"
+    run_key = (upload_hashes, use_blocklist, str(cutoff_date) if use_blocklist else None, retention_days, dedupe)
+
+    if st.button("🚀 Run Cleaning", use_container_width=True, type="primary"):
+        # Same upload and options as an earlier (or queued) job: reuse it (and don't re-apply the blocklist)
+        job = runner.find(run_key)
+        if job is None:
+            job = runner.submit(run_cleaning, uploads, use_blocklist, cutoff_date, retention_days, dedupe,
+                                label=upload_label, key=run_key)
+        st.session_state["job_id"] = job.id
+        # Keep the job's (secret) id in the URL so a page refresh picks it up again
+        st.query_params["job"] = job.id
+
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+job = runner.get(job_id) if job_id else None
+
+# ====================================================
+# Job Progress (polled while queued or running)
+# ====================================================
+if job is not None and job.status in (QUEUED, RUNNING):
+    with st.container(border=True):
+        st.subheader(f"⏳ Processing {job.label}")
+        if job.status == QUEUED:
+            ahead = sum(1 for other in runner.jobs() if other.status in (QUEUED, RUNNING) and other.submitted_at < job.submitted_at)
+            st.progress(0.0, text=f"Queued ({ahead} job(s) ahead)")
+        else:
+            done = max((PROGRESS_STAGES.index(s) for s in job.stages_seen if s in PROGRESS_STAGES), default=0)
+            rows = f" · {job.rows:,} rows" if job.rows else ""
+            st.progress(done / len(PROGRESS_STAGES), text=f"{job.stage or 'starting'}{rows} · {job.elapsed():.1f}s")
+        if job.cancel_requested:
+            st.info("Cancelling...")
+        elif st.button("✖️ Cancel", key=f"cancel_{job.id}"):
+            runner.cancel(job.id)
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+elif job is not None and job.status == CANCELLED:
+    st.warning(f"✖️ Job for {job.label} was cancelled.")
+
+elif job is not None and job.status == FAILED:
+    st.error(f"❌ Processing {job.label} failed: {job.error}")
+
+elif job is not None and job.status == DONE:
+    result, files = job.result["result"], job.result["files"]
+    use_blocklist = job.key[1]
+
+    for level, message in job.result["notices"]:
+        getattr(st, level)(message)
+
+    # ====================================================
+    # Process Summary (keeps original metrics)
+    # ====================================================
+    with st.container(border=True):
+        st.subheader("📊 Process Summary")
+
+        # Row counts come straight from process_file (no re-parsing of input/output files)
+        orig_rows = result.get("rows", {}).get("input", "N/A")
+        cleaned_total = result.get("rows", {}).get("output", 0)
+
+        removed_rows = (orig_rows - cleaned_total) if isinstance(orig_rows, int) else "N/A"
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("✅ Processed", orig_rows)
+        m2.metric("🧹 Cleaned", cleaned_total)
+        m3.metric("⛔ Removed (Blocklist)", removed_rows if use_blocklist else "N/A")
+        m4.metric("📋 New Blocklist", result["new_numbers"] if use_blocklist else "N/A")
+
+        if result.get("inputs"):
+            duplicates = sum(result["inputs"]["cross_file_duplicates"].values())
+            st.caption(f"Merged {len(result['inputs']['files'])} files; "
+                       f"{duplicates} rows repeating a mobile from an earlier file were dropped.")
+
+        if "duplicate_leads" in result:
+            st.caption(f"🔁 {result['duplicate_leads']} duplicate leads removed (logged as duplicate_lead).")
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("✏️ Names Fixed", result["name_fixes"])
+        c2.metric("📱 Mobiles Fixed", result["mobile_fixes"])
+        c3.metric("⚠️ Invalid Cases", result["invalid_cases"])
+
+        # Per-stage breakdown (time, rows, peak memory growth)
+        if result.get("stages"):
+            total_seconds = sum(s["seconds"] for s in result["stages"].values())
+            with st.expander(f"⏱️ Stage Timings ({total_seconds:.2f}s total)"):
+                stages_df = pd.DataFrame.from_dict(result["stages"], orient="index")
+                stages_df.index.name = "stage"
+                stages_df.columns = ["Seconds", "Rows", "Peak Memory Δ (MB)"]
+                st.dataframe(stages_df, use_container_width=True)
+
+    # ====================================================
+    # Downloads (two separate files)
+    # ====================================================
+    with st.container(border=True):
+        st.subheader("⬇️ Downloads")
+        d1, d2, d3 = st.columns(3)
+
+        pretty_date = format_today_for_filename()
+
+        if files.get("reminder"):
+            with d1:
+                st.download_button(
+                    "⬇️ Download TD Reminder File",
+                    files["reminder"],
+                    file_name=f"Revolt TD Reminder {pretty_date}.xlsx",
+                    use_container_width=True
+                )
+
+        if files.get("feedback"):
+            with d2:
+                st.download_button(
+                    "⬇️ Download TD Feedback File",
+                    files["feedback"],
+                    file_name=f"Revolt TD Feedback {pretty_date}.xlsx",
+                    use_container_width=True
+                )
+
+        # Flagged log & blocklist download
+        with d3:
+            if files.get("flagged_log"):
+                st.download_button("⚠️ Flagged Log", files["flagged_log"], file_name=f"flagged {pretty_date}.txt", use_container_width=True)
             else:
-                st.info("ℹ️ No new blocklist entries to commit, skipping GitHub push.")
-
-        # ====================================================
-        # Cleanup temp files (keep generated files briefly)
-        # ====================================================
-        keep_files = [blocklist_file]
-        # keep outputs so user can download; cleanup older ones via patterns
-        cleanup_old_files(keep_files + [result.get("outputs", {}).get("reminder") or "",
-                                        result.get("outputs", {}).get("feedback") or "",
-                                        result.get("flagged_log") or ""])
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
+                st.info("⚠️ No flagged log available.")
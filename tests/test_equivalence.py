@@ -0,0 +1,108 @@
+import io
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Revoltv11 as rv  # noqa: E402
+import benchmark  # noqa: E402
+
+NAMES = ["  ravi kumar ", "RAVI KUMAR RV400", "Priya_Sharma", "NehaVerma", "O'Brien", "Sita-Devi 9082",
+         "joker", "12345", "bcd", "k", "", None, np.nan, 42, "Amit!!", "spam callers", "Dr. Anjali (RV1)"]
+MOBILES = {
+    "str": ["+91 9876543210", "919812345678", "98765", "0091-9876543210", "9876543210", "", None, "+91-98765 43210"],
+    "int": [919876543210, 9876543210, 12345, 0, 919812345678],
+    "float": [919812345678.0, np.nan, 98765.0, 9876543210.0, 1e17, 9.5],
+    "object": [919876543210, "+91 9876543210", 98765.0, None, "abc"],
+}
+DATES = {
+    "mixed": ["2024-10-07", "07/10/2024", "7 Oct 2024", "13/01/2024", "01/13/2024", "2024-10-07 10:30:00",
+              "not a date", None, "", pd.Timestamp("2025-03-04"), 45000],
+    "ambiguous": ["03/04/2024", "04/03/2024", "12/11/2024", "31/12/2024", "2024-02-03"],
+    "datetime": pd.to_datetime(["2024-10-07 00:00", None, "2025-01-31 18:00"]),
+}
+
+
+def row_log(clean, values) -> tuple:
+    """Run a row-by-row cleaner over `values`; returns (cleaned values, log frame)."""
+    entries = []
+    cleaned = [clean(value, index, entries) for index, value in enumerate(values)]
+    log = rv.FlaggedLog()
+    for entry in entries:
+        log.append(entry)
+    return cleaned, log.to_frame()
+
+
+def test_clean_customer_names_matches_row_version():
+    names = pd.Series(NAMES, dtype=object)
+    log = rv.FlaggedLog()
+    cleaned = rv.clean_customer_names(names, log)
+
+    expected, expected_log = row_log(rv.clean_customer_name, NAMES)
+    assert cleaned.tolist() == expected
+    pd.testing.assert_frame_equal(log.to_frame(), expected_log)
+
+
+@pytest.mark.parametrize("dtype", MOBILES)
+def test_clean_mobile_numbers_matches_row_version(dtype):
+    mobiles = pd.Series(MOBILES[dtype], dtype=None if dtype != "object" else object)
+    log = rv.FlaggedLog()
+    cleaned = rv.clean_mobile_numbers(mobiles, log)
+
+    expected, expected_log = row_log(rv.clean_mobile_number, mobiles.tolist())
+    assert cleaned.tolist() == expected
+    pd.testing.assert_frame_equal(log.to_frame(), expected_log)
+
+
+@pytest.mark.parametrize("kind", DATES)
+def test_format_dates_matches_row_version(kind):
+    values = pd.Series(DATES[kind], dtype=None if kind == "datetime" else object)
+    expected = rv.format_date_column(pd.DataFrame({"d": values}), "d")["d"]
+    assert rv.format_dates(values).tolist() == expected.tolist()
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    path = benchmark.write_input(600, str(data_dir), seed=3)
+    blocklist = pd.DataFrame({"Mobile": benchmark.synthetic_blocklist(3)[:5000], "DateAdded": "2025-09-01"})
+    blocklist.to_csv(data_dir / rv.BLOCKLIST_FILE, index=False)
+    return path, data_dir / rv.BLOCKLIST_FILE
+
+
+def run_mode(tmp_path, monkeypatch, workbook, name, runs=1, **kwargs):
+    """process_file in a fresh directory (own blocklist copy); outputs read back as frames."""
+    path, blocklist = workbook
+    run_dir = tmp_path / name
+    run_dir.mkdir()
+    monkeypatch.chdir(run_dir)
+    for _ in range(runs):
+        shutil.copy(blocklist, run_dir)
+        options = rv.RunOptions(in_memory=True, row_store_path=str(run_dir / "rows"), **kwargs)
+        result = rv.process_file(path, options=options)
+    outputs = result["output_bytes"]
+    return {
+        "reminder": pd.read_excel(io.BytesIO(outputs["reminder"]), dtype=str),
+        "feedback": pd.read_excel(io.BytesIO(outputs["feedback"]), dtype=str),
+        "flagged_log": outputs["flagged_log"],
+        "counts": {key: result[key] for key in ("new_numbers", "name_fixes", "mobile_fixes", "invalid_cases")},
+    }
+
+
+@pytest.mark.parametrize("mode, runs, kwargs", [
+    ("workers", 1, {"workers": 2, "partition_rows": 128}),
+    ("incremental", 2, {"incremental": True}),
+    ("low_memory", 1, {"low_memory": True}),
+])
+def test_process_file_modes_match_serial(tmp_path, monkeypatch, workbook, mode, runs, kwargs):
+    serial = run_mode(tmp_path, monkeypatch, workbook, "serial")
+    other = run_mode(tmp_path, monkeypatch, workbook, mode, runs=runs, **kwargs)
+
+    assert other["counts"] == serial["counts"]
+    assert other["flagged_log"] == serial["flagged_log"]
+    pd.testing.assert_frame_equal(other["reminder"], serial["reminder"])
+    pd.testing.assert_frame_equal(other["feedback"], serial["feedback"])
@@ -0,0 +1,19 @@
+import io
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Revoltv11 as rv  # noqa: E402
+
+
+def test_write_quotes_commas_and_line_breaks():
+    log = rv.FlaggedLog()
+    log.extend([0, 1], ["Kumar, Ravi", "Sita\r\nDevi"], "name_cleaned", cleaned=["Kumar Ravi", "Sita Devi"])
+    buffer = io.StringIO()
+    log.write(buffer)
+
+    back = pd.read_csv(io.StringIO(buffer.getvalue()), dtype=str)
+    assert list(back.columns) == rv.LOG_COLUMNS
+    assert back["original"].tolist() == ["Kumar, Ravi", "Sita\r\nDevi"]
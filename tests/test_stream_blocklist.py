@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Revoltv11 as rv  # noqa: E402
+
+
+def write_leads(path):
+    pd.DataFrame({
+        "hub": ["Delhi", "Pune", "Delhi"],
+        "Customer Name": ["Ravi Kumar", "Sita Devi", "Ravi Kumar"],
+        "Mobile Number": ["+91 9876543210", "+91 98765 43211", "+91 9876543210"],
+        "opportunityid": ["O1", "O2", "O3"],
+    }).to_csv(path, index=False)
+
+
+@pytest.mark.parametrize("blocklist", ["missing", "empty"])
+def test_stream_with_empty_blocklist(tmp_path, monkeypatch, blocklist):
+    monkeypatch.chdir(tmp_path)
+    write_leads("in.csv")
+    if blocklist == "empty":
+        with open(rv.BLOCKLIST_FILE, "w", encoding="utf-8") as f:
+            f.write("Mobile,DateAdded\n")
+
+    result = rv.process_file("in.csv", stream_chunksize=2, flagged_log_path="flagged.txt")
+
+    assert result["new_numbers"] == 2
+    assert result["rows"]["output"] == 3
+    assert len(rv.BlocklistStore.from_csv(rv.BLOCKLIST_FILE)) == 2
+
+
+def test_stream_reads_the_types_a_whole_file_read_does(tmp_path, monkeypatch):
+    # Digits with a blank read as float64 in one go; the stream must not see them as text
+    pd.DataFrame({
+        "Customer Name": ["Ravi Kumar", "Sita Devi", "Asha Rao"],
+        "Mobile Number": ["919812345678", "", "919812345679"],
+    }).to_csv(tmp_path / "in.csv", index=False)
+    logs = {}
+    for mode, chunksize in [("whole", None), ("stream", 1)]:
+        (tmp_path / mode).mkdir()
+        monkeypatch.chdir(tmp_path / mode)
+        rv.process_file(str(tmp_path / "in.csv"), stream_chunksize=chunksize,
+                        flagged_log_path="flagged.txt", apply_blocklist=False)
+        logs[mode] = (tmp_path / mode / "flagged.txt").read_text(encoding="utf-8")
+
+    assert "8123456780" in logs["whole"]
+    assert logs["stream"] == logs["whole"]